@@ -6,31 +6,76 @@ import prepare_images
 import azprofile_alma
 import ratio_alma
 import sys
+from pipeline import Stage,Pipeline
+import results
 
-# Analyse ALMA image
-image_alma=cflux_alma.image("RTout0001_000854.89.fits.gz",0.074,0.057,63.0)
-image_alma_rotated=prepare_images.prepare_alma_image(image_alma,158.6)
-cflux_alma.radial_profile_gofish("../alma_model_rotated.fits",49.7,158.6,113.43,0.0,0.0,120.0)
 
+############################################################
+# Stages of the analysis, with the files they read and write.
+# Stages whose inputs did not change since the last run are
+# skipped; the ALMA and J-band branches run concurrently.
+alma_fits="../output/RTout0001_000854.89.fits.gz"
+jband_fits="../output/RToutObs0001_000001.25.fits.gz"
+alma_config=["../Image_alma.out","../input.dat"]
+jband_config=["../Image_jband.out","../input.dat"]
 
-# Analyse Qphi image
-image_Qphi=cflux_jband.image("RToutObs0001_000001.25.fits.gz")
-cflux_jband.radial_profile(image_Qphi,120.0)
-jband_ratios.find_ratios()
-image_Qphi_rotated=prepare_images.prepare_Qphi_image(image_Qphi,158.6)
 
+def alma_image(fits_image,beam_x,beam_y,beam_angle,PA_disk):
+    # Analyse ALMA image
+    image_alma=cflux_alma.image(fits_image,beam_x,beam_y,beam_angle)
+    prepare_images.prepare_alma_image(image_alma,PA_disk)
 
-# profiles_modeled
-profiles_modeled.output_data()
 
+def jband_image(fits_image,lim,PA_disk):
+    # Analyse Qphi image
+    image_Qphi=cflux_jband.image(fits_image)
+    cflux_jband.radial_profile(image_Qphi,lim)
+    prepare_images.prepare_Qphi_image(image_Qphi,PA_disk)
 
-print(prepare_images.peak_flux_alma_model("../alma_model_rotated.fits"))
 
+def peak_flux(alma_model_rotated):
+    print(prepare_images.peak_flux_alma_model(alma_model_rotated))
 
 
-# azprofile ALMA
-azprofile_alma.azimuthal_profile("../alma_model_rotated.fits",0.02,50.0,30.0,49.7,158.6,113.43,72)
+stages=[
+    # ALMA branch
+    Stage("alma_image",alma_image,
+          inputs=[alma_fits]+alma_config,
+          outputs=["../alma_model_rotated.fits"],
+          args=("RTout0001_000854.89.fits.gz",0.074,0.057,63.0,158.6)),
+    Stage("alma_profile",cflux_alma.radial_profile_gofish,
+          inputs=["../alma_model_rotated.fits"],
+          outputs=[results.path("alma_radial_profile_modeled")],
+          args=("../alma_model_rotated.fits",49.7,158.6,113.43,0.0,0.0,120.0)),
+    Stage("peak_flux",peak_flux,
+          inputs=["../alma_model_rotated.fits"]+alma_config,
+          args=("../alma_model_rotated.fits",)),
+    Stage("azprofile_alma",azprofile_alma.azimuthal_profile,
+          inputs=["../alma_model_rotated.fits"],
+          outputs=[results.path("azprofile_alma_mod")],
+          args=("../alma_model_rotated.fits",0.02,50.0,30.0,49.7,158.6,113.43,72)),
+    Stage("ratio_alma",ratio_alma.ratio_SMsm,
+          inputs=[results.path("azprofile_alma_mod")],
+          outputs=["../ratios.dat"]),
 
+    # J-band branch
+    Stage("jband_image",jband_image,
+          inputs=[jband_fits]+jband_config,
+          outputs=[results.path("jband_radial_profile_modeled"),"../Qphi_model_rotated.fits"],
+          args=("RToutObs0001_000001.25.fits.gz",120.0,158.6)),
+    Stage("jband_ratios",jband_ratios.find_ratios,
+          inputs=[results.path("jband_radial_profile_modeled")],
+          outputs=["../ratios_jband_radial_flux.dat"]),
 
-# Ratio alma
-ratio_alma.ratio_SMsm()
+    # profiles_modeled: needs both branches, plots
+    Stage("profiles_modeled",profiles_modeled.output_data,
+          inputs=[alma_fits,jband_fits,"../output/MCSpec0001.dat","../output/star0001.dat",
+                  "../surface_density_PDS70.dat",results.path("alma_radial_profile_modeled"),
+                  results.path("jband_radial_profile_modeled")]+alma_config+jband_config,
+          outputs=["../spectrum_PDS70_system.dat","../spectrum_PDS70_star.dat","../fig_all.png"],
+          main_thread=True),
+]
+
+
+if __name__=="__main__":
+    Pipeline(stages,state_file="../pipeline_state.json").run(nworkers=2,force="--force" in sys.argv)
@@ -0,0 +1,92 @@
+import os
+import sys
+import glob
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pipeline import Pipeline
+import results
+
+
+############################################################
+#
+# Batch analysis of many MCMax3D runs:
+#
+#   python batch.py "/data/.../1BS_CPD_mass_corrected/run*" [nworkers] [--force]
+#
+# Every run directory is analysed in its own process, from
+# <run>/analysis so that the '../' paths of the pipeline
+# point to the run. Only the image -> convolve -> rotate ->
+# profile stages of PDS70_pipeline.py are run, incrementally.
+# The profiles of all runs are collected into one store,
+# batch_results.npz, with one group per run (see results).
+#
+############################################################
+
+workdir='analysis'
+chain=["alma_image","alma_profile","azprofile_alma","jband_image"]
+profiles=["alma_radial_profile_modeled","jband_radial_profile_modeled","azprofile_alma_mod"]
+
+
+def analyse_run(run_dir,force=False):
+
+    ############################################################
+    #
+    # Run the chain inside run_dir. Its profiles end up in the
+    # run's results store.
+    #
+    # Returns None, or the traceback (str) if the analysis of
+    # this run failed.
+    #
+    ############################################################
+
+    try:
+        cwd=os.path.join(os.path.abspath(run_dir),workdir)
+        os.makedirs(cwd,exist_ok=True)
+        os.chdir(cwd)
+        from PDS70_pipeline import stages
+        Pipeline([stage for stage in stages if stage.name in chain],
+                 state_file="../pipeline_state.json").run(nworkers=2,force=force)
+        return None
+    except Exception:
+        return traceback.format_exc()
+
+
+def run_batch(pattern,nworkers=None,force=False):
+
+    ############################################################
+    #
+    # pattern: glob of run directories
+    # nworkers: number of runs analysed at the same time
+    # (default: number of CPUs)
+    # force: rerun every stage
+    #
+    # Returns {run name: run directory} of the runs analysed
+    # successfully, the name being the path of the run relative
+    # to the common parent of all matched runs (e.g.
+    # gridA/run01). Failed runs are reported and left out.
+    #
+    ############################################################
+
+    runs=sorted(path for path in glob.glob(pattern) if os.path.isdir(path))
+    if not runs:
+        return {}
+    root=os.path.commonpath([os.path.dirname(os.path.abspath(run)) for run in runs])
+    done={}
+    with ProcessPoolExecutor(max_workers=nworkers) as pool:
+        for run,error in zip(runs,pool.map(analyse_run,runs,[force]*len(runs))):
+            if error is not None:
+                print("Run %s failed:\n%s"%(run,error))
+                continue
+            print("Run %s done"%run)
+            name=os.path.relpath(os.path.abspath(run),root).replace(os.sep,'/')
+            if name in done:
+                raise ValueError("Runs %s and %s have the same name %s"%(done[name],run,name))
+            done[name]=os.path.abspath(run)
+    return done
+
+
+if __name__=="__main__":
+    args=[arg for arg in sys.argv[1:] if arg!="--force"]
+    nworkers=int(args[1]) if len(args)>1 else None
+    runs=run_batch(args[0],nworkers,force="--force" in sys.argv)
+    results.collect(runs,profiles,"batch_results.npz")
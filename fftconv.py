@@ -0,0 +1,118 @@
+import numpy as np
+from scipy import fft
+import threading
+from collections import OrderedDict
+
+
+############################################################
+# Fourier transforms of the beam kernels, keyed on
+# (shape,beam,PA,pxsize). Only the most recent ones are kept.
+kernel_cache_size=16
+_kernel_cache=OrderedDict()
+_kernel_lock=threading.Lock()
+
+
+def gaussian_kernel(x_stddev,y_stddev,theta):
+
+    ############################################################
+    #
+    # Normalized 2D Gaussian kernel, sampled at pixel centres
+    # on a (8*stddev) odd-sized box, as Gaussian2DKernel does.
+    #
+    # x_stddev,y_stddev: standard deviations (px)
+    # theta: rotation angle of the x-axis of the kernel (rad)
+    #
+    ############################################################
+
+    size=int(np.ceil(8*max(x_stddev,y_stddev)))
+    if size%2==0:
+        size+=1
+    half=size//2
+    x=np.arange(-half,half+1,dtype=float)
+    dx,dy=x[None,:],x[:,None]
+
+    cost2=np.cos(theta)**2
+    sint2=np.sin(theta)**2
+    sin2t=np.sin(2*theta)
+    a=0.5*(cost2/x_stddev**2+sint2/y_stddev**2)
+    b=0.5*(sin2t/x_stddev**2-sin2t/y_stddev**2)
+    c=0.5*(sint2/x_stddev**2+cost2/y_stddev**2)
+    kernel=np.exp(-(a*dx**2+b*dx*dy+c*dy**2))
+    return kernel/kernel.sum()
+
+
+def kernel_fft(shape,beam_x,beam_y,angle,pxsize):
+
+    ############################################################
+    #
+    # Real FFT of the beam kernel, zero-padded for a linear
+    # (non-periodic) convolution of an image with this shape.
+    #
+    # shape: (rows,columns) of the image
+    # beam_x,beam_y: standard deviations of the beam, in the
+    # same units as pxsize
+    # angle: orientation of the beam (rad)
+    # pxsize: pixel scale
+    #
+    # Returns the transform, the padded shape and the offset of
+    # the kernel centre. Results are cached on the arguments.
+    #
+    ############################################################
+
+    key=(tuple(shape),beam_x,beam_y,angle,pxsize)
+    with _kernel_lock:
+        if key in _kernel_cache:
+            _kernel_cache.move_to_end(key)
+            return _kernel_cache[key]
+
+    kernel=gaussian_kernel(beam_x/pxsize,beam_y/pxsize,angle)
+    half=kernel.shape[0]//2
+    padded=(fft.next_fast_len(shape[0]+2*half,real=True),
+            fft.next_fast_len(shape[1]+2*half,real=True))
+    kfft=fft.rfft2(kernel,s=padded)
+
+    with _kernel_lock:
+        _kernel_cache[key]=(kfft,padded,half)
+        while len(_kernel_cache)>kernel_cache_size:
+            _kernel_cache.popitem(last=False)
+    return kfft,padded,half
+
+
+def convolve_beam(data,beam_x,beam_y,angle,pxsize,nan_treatment='interpolate',workers=None):
+
+    ############################################################
+    #
+    # FFT convolution of an image with a Gaussian beam. Edges
+    # are padded with zeros, as astropy's convolve does with
+    # boundary='fill'.
+    #
+    # data: 2D image
+    # beam_x,beam_y: standard deviations of the beam, in the
+    # same units as pxsize
+    # angle: orientation of the beam (rad)
+    # pxsize: pixel scale
+    # nan_treatment: 'interpolate' renormalizes the kernel over
+    # the valid pixels around each NaN; 'fill' treats NaNs as 0
+    # workers: number of threads used by scipy.fft
+    #
+    # Without NaNs this costs one forward and one inverse FFT.
+    #
+    ############################################################
+
+    data=np.asarray(data,dtype=float)
+    kfft,padded,half=kernel_fft(data.shape,beam_x,beam_y,angle,pxsize)
+    crop=(slice(half,half+data.shape[0]),slice(half,half+data.shape[1]))
+
+    nanmask=~np.isfinite(data)
+    if nanmask.any():
+        data=np.where(nanmask,0.0,data)
+
+    out=fft.irfft2(fft.rfft2(data,s=padded,workers=workers)*kfft,s=padded,workers=workers)[crop]
+
+    if nan_treatment=='interpolate' and nanmask.any():
+        lost=fft.irfft2(fft.rfft2(nanmask.astype(float),s=padded,workers=workers)*kfft,
+                        s=padded,workers=workers)[crop]
+        with np.errstate(invalid='ignore',divide='ignore'):
+            out=out/(1.0-lost)
+
+    return out
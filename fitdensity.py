@@ -0,0 +1,177 @@
+import os
+import json
+import shutil
+import subprocess
+import numpy as np
+from fitscache import content_hash
+import interpol
+import results
+
+
+############################################################
+#
+# Fixed-point fit of the surface density to the observed
+# ALMA radial profile:
+#
+#   run MCMax3D -> extract the modeled profile -> correct
+#   the density with interpol.modify_density -> repeat
+#
+# until the modeled profile is within tol of the observed
+# one. Each stage remembers the hashes of its inputs in the
+# checkpoint folder and is skipped when they did not change,
+# so a restarted fit picks up where it stopped.
+#
+############################################################
+
+model_dir='..'
+model_command='MCMax3D input.dat'
+model_image='../output/RTout0001_000854.89.fits.gz'
+density_file='../surface_density_PDS70.dat'
+obs_file='alma_radial_profile_observed.dat'
+mod_file=results.path('alma_radial_profile_modeled')
+checkpoint_dir='../density_fit'
+
+
+def alma_profile():
+
+    ############################################################
+    #
+    # ALMA branch of PDS70_pipeline.py: image, convolution,
+    # rotation and gofish radial profile into mod_file.
+    #
+    ############################################################
+
+    import cflux_alma
+    import prepare_images
+    image_alma=cflux_alma.image(os.path.basename(model_image),0.074,0.057,63.0)
+    prepare_images.prepare_alma_image(image_alma,158.6)
+    cflux_alma.radial_profile_gofish("../alma_model_rotated.fits",49.7,158.6,113.43,0.0,0.0,120.0)
+    return None
+
+
+def profile_deviation(obs_file,mod_file,rmin=None,rmax=None):
+
+    ############################################################
+    #
+    # Largest relative deviation |f_mod/f_obs-1| of the modeled
+    # profile, at the model radii inside the observed profile
+    # and inside [rmin,rmax] (AU) when given.
+    #
+    ############################################################
+
+    data_obs=np.loadtxt(obs_file)
+    data_mod=results.load_profile(mod_file)
+    r_mod=data_mod["r"]
+    keep=(r_mod>=data_obs[:,0].min())&(r_mod<=data_obs[:,0].max())
+    if rmin is not None:
+        keep&=r_mod>=rmin
+    if rmax is not None:
+        keep&=r_mod<=rmax
+    f_obs=np.interp(r_mod[keep],data_obs[:,0],data_obs[:,1])
+    return np.max(np.abs(data_mod["b"][keep]/f_obs-1.0))
+
+
+class Stages:
+
+    ############################################################
+    #
+    # Input and output hashes of the stages already run, stored
+    # as json in the checkpoint folder.
+    #
+    ############################################################
+
+    def __init__(self,folder):
+        self.file=os.path.join(folder,'stages.json')
+        self.done={}
+        if os.path.exists(self.file):
+            with open(self.file) as f:
+                self.done=json.load(f)
+
+
+    def run(self,name,inputs,func,outputs=()):
+
+        ############################################################
+        # Run func unless the inputs have the hashes recorded at
+        # the last run of this stage and the outputs still exist
+        # with the hashes they had after it. Returns True if it
+        # ran.
+        key=[content_hash(path) for path in inputs]
+        last=self.done.get(name,{})
+        if (last.get('inputs')==key and all(os.path.exists(path) for path in outputs)
+            and last.get('outputs')==[content_hash(path) for path in outputs]):
+            print("Stage %s: inputs and outputs unchanged, skipped"%name)
+            return False
+        func()
+        self.done[name]={'inputs':key,'outputs':[content_hash(path) for path in outputs]}
+        tmp=self.file+'.tmp'
+        with open(tmp,'w') as f:
+            json.dump(self.done,f,indent=1)
+        os.replace(tmp,self.file)
+        return True
+
+
+def last_iteration(history):
+
+    ############################################################
+    # Number and deviation of the last iteration recorded in
+    # history, (-1,inf) for a new fit
+    if not os.path.exists(history) or os.path.getsize(history)==0:
+        return -1,np.inf
+    k,deviation=np.loadtxt(history,ndmin=2)[-1]
+    return int(k),deviation
+
+
+def run_model():
+    subprocess.run(model_command,shell=True,cwd=model_dir,check=True)
+    return None
+
+
+def fit_density(niter=10,damping=0.5,tol=0.05,rmin=None,rmax=None,
+                run_model=run_model,extract_profile=alma_profile):
+
+    ############################################################
+    #
+    # niter: maximum number of iterations
+    # damping: exponent of the correction (see modify_density)
+    # tol: stop when the modeled profile is within this
+    # relative deviation of the observed one
+    # rmin,rmax: radial range where the deviation is measured (AU)
+    # run_model,extract_profile: the model and analysis stages
+    #
+    # The density of every iteration is kept as
+    # checkpoint_dir/surface_density_NN.dat and the deviations
+    # in checkpoint_dir/history.dat. A restarted fit continues
+    # after the last iteration in history.dat, so the earlier
+    # checkpoints are never overwritten; niter counts the
+    # iterations of all runs together. Returns the last
+    # deviation.
+    #
+    ############################################################
+
+    os.makedirs(checkpoint_dir,exist_ok=True)
+    stages=Stages(checkpoint_dir)
+    history=os.path.join(checkpoint_dir,'history.dat')
+
+    start,deviation=last_iteration(history)
+    if deviation<tol:
+        return deviation
+    for k in range(start+1,niter):
+        shutil.copyfile(density_file,os.path.join(checkpoint_dir,'surface_density_%02d.dat'%k))
+
+        stages.run('model',[density_file,os.path.join(model_dir,'input.dat')],run_model,[model_image])
+        stages.run('profile',[model_image],extract_profile,[mod_file])
+
+        deviation=profile_deviation(obs_file,mod_file,rmin,rmax)
+        print("Iteration %d: max. relative deviation %.4e"%(k,deviation))
+        with open(history,'a') as f:
+            f.write("%d %.15e\n"%(k,deviation))
+        if deviation<tol:
+            break
+
+        interpol.modify_density(obs_file,mod_file,density_file,damping)
+
+    return deviation
+
+
+if __name__=="__main__":
+    fit_density()
@@ -0,0 +1,150 @@
+import os
+import gzip
+import shutil
+import hashlib
+import tempfile
+import time
+from astropy.io import fits
+
+
+############################################################
+# Folder holding the decompressed copies of *.fits.gz files.
+# Each copy is named after the hash of the compressed file,
+# so a re-run model with new output gets a new entry. The
+# folder is kept under max_size bytes by dropping the least
+# recently used copies.
+cache_dir=os.environ.get("FITS_CACHE_DIR",os.path.join(os.path.expanduser("~"),".cache","fitscache"))
+max_size=int(os.environ.get("FITS_CACHE_MAX_SIZE",20*1024**3)) # bytes
+min_age=600.0 # copies used more recently than this (s) are never evicted
+_hash_cache={}
+
+
+def content_hash(path,blocksize=1<<20):
+
+    ############################################################
+    #
+    # SHA-1 of the file content. The result is remembered for
+    # the lifetime of the process as long as the size and the
+    # modification time of the file do not change.
+    #
+    ############################################################
+
+    path=os.path.abspath(path)
+    st=os.stat(path)
+    key=(path,st.st_size,st.st_mtime)
+    if key not in _hash_cache:
+        h=hashlib.sha1()
+        with open(path,"rb") as f:
+            for block in iter(lambda: f.read(blocksize),b""):
+                h.update(block)
+        _hash_cache[key]=h.hexdigest()
+    return _hash_cache[key]
+
+
+def decompressed(path):
+
+    ############################################################
+    #
+    # Path to an uncompressed copy of a fits file. Files that
+    # are not gzipped are returned as they are. Gzipped files
+    # are decompressed once into cache_dir; the copy is written
+    # to a temporary file and renamed, so concurrent runs never
+    # see a half-written file. Every use refreshes the access
+    # time of the copy, which orders the eviction in evict and
+    # protects it for min_age seconds. A copy evicted by
+    # another process in the meantime is decompressed again.
+    #
+    ############################################################
+
+    if not path.endswith(".gz"):
+        return path
+
+    target=os.path.join(cache_dir,content_hash(path)+".fits")
+    try:
+        os.utime(target,(time.time(),os.stat(target).st_mtime))
+    except FileNotFoundError:
+        os.makedirs(cache_dir,exist_ok=True)
+        fd,tmp=tempfile.mkstemp(dir=cache_dir,suffix=".tmp")
+        try:
+            with gzip.open(path,"rb") as fin, os.fdopen(fd,"wb") as fout:
+                shutil.copyfileobj(fin,fout,1<<20)
+            os.replace(tmp,target)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        evict(keep=target)
+    return target
+
+
+def _entries():
+    if not os.path.isdir(cache_dir):
+        return []
+    entries=[]
+    for name in os.listdir(cache_dir):
+        if name.endswith(".fits"):
+            path=os.path.join(cache_dir,name)
+            try:
+                entries.append((os.stat(path),path))
+            except FileNotFoundError:
+                pass
+    return entries
+
+
+def evict(size=None,keep=None,age=None):
+
+    ############################################################
+    #
+    # Remove the least recently used copies (by access time)
+    # until the cache holds at most size bytes (default
+    # max_size). keep and the copies used in the last age
+    # seconds (default min_age), which another process may be
+    # about to open, are never removed. Returns the number of
+    # bytes freed.
+    #
+    ############################################################
+
+    if size is None:
+        size=max_size
+    if age is None:
+        age=min_age
+    entries=sorted(_entries(),key=lambda entry: entry[0].st_atime)
+    total=sum(st.st_size for st,path in entries)
+    freed=0
+    now=time.time()
+    for st,path in entries:
+        if total<=size:
+            break
+        if keep is not None and os.path.abspath(path)==os.path.abspath(keep):
+            continue
+        if now-st.st_atime<age:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total-=st.st_size
+        freed+=st.st_size
+    return freed
+
+
+def purge():
+
+    ############################################################
+    # Remove all decompressed copies. Returns the bytes freed.
+    # Only call it when no other run is using the cache
+    return evict(size=0,age=0.0)
+
+
+def open_fits(path):
+
+    ############################################################
+    #
+    # Drop-in replacement for fits.open(path) that serves
+    # memory-mapped views of the decompressed cache. The file
+    # is opened read-only; the maps are copy-on-write, so
+    # writes to the data go to private pages and never reach
+    # the cached copy.
+    #
+    ############################################################
+
+    return fits.open(decompressed(path),mode='readonly',memmap=True)
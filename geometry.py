@@ -0,0 +1,85 @@
+import collections
+import numpy as np
+
+
+############################################################
+#
+# Conversions between angles on the sky, projected lengths
+# and pixels without astropy Quantities. The factors for a
+# (pixel scale, distance) pair are computed once and cached;
+# every function accepts scalars or arrays.
+#
+############################################################
+
+arcsec_to_rad=np.pi/648000.0
+rad_to_arcsec=648000.0/np.pi
+pc_to_au=648000.0/np.pi # IAU definition of the parsec
+
+Scale=collections.namedtuple('Scale',['au_px','px_au','rad_px','px_rad'])
+_scale_cache={}
+
+
+def scale(pxsize,d):
+
+    ############################################################
+    #
+    # pxsize: pixel scale (arcsec/px)
+    # d: distance to the source (pc)
+    #
+    # Returns the factors au_px (AU/px), px_au (px/AU),
+    # rad_px (rad/px) and px_rad (px/rad). 1 arcsec at 1 pc
+    # is 1 AU, so au_px=pxsize*d.
+    #
+    ############################################################
+
+    key=(float(pxsize),float(d))
+    if key not in _scale_cache:
+        au_px=key[0]*key[1]
+        rad_px=key[0]*arcsec_to_rad
+        _scale_cache[key]=Scale(au_px,1.0/au_px,rad_px,1.0/rad_px)
+    return _scale_cache[key]
+
+
+def arcsec_to_au(a,d):
+    return np.multiply(a,d)
+
+
+def au_to_arcsec(l,d):
+    return np.divide(l,d)
+
+
+def to_px(l,pxsize,d):
+
+    ############################################################
+    # Length l (AU) in pixels
+    return np.multiply(l,scale(pxsize,d).px_au)
+
+
+def to_au(x,y,xc,yc,pxsize,d):
+
+    ############################################################
+    #
+    # Projected distance (AU) of the pixel positions x,y (px)
+    # to the centre xc,yc (px). Positive for x<=xc, negative
+    # otherwise.
+    #
+    ############################################################
+
+    x=np.asarray(x,dtype=float)
+    dr=np.hypot(x-xc,np.subtract(y,yc))*scale(pxsize,d).au_px
+    return np.where(x<=xc,dr,-dr)
+
+
+def to_xy(r,PA,xc,yc,pxsize,d):
+
+    ############################################################
+    #
+    # Pixel position (px) of a point at projected distance r
+    # (AU) and position angle PA (deg, east of north) from the
+    # centre xc,yc (px).
+    #
+    ############################################################
+
+    r=to_px(r,pxsize,d)
+    angle=np.deg2rad(np.add(PA,90.0)) # w.r.t. x-axis
+    return (xc+r*np.cos(angle),yc+r*np.sin(angle))
@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 from gofish import imagecube
 import sys
 import matplotlib.gridspec as gridspec
+import results
 
 ############################################################
 # Load data
@@ -51,10 +52,7 @@ plt.show()
 
 ############################################################
 # Writing file
-f=open("../cut_along_c_mod.dat","w")
-for (i,j,k) in zip(x,y,dy):
-    f.write("%.15e %.15e %.15e\n"%(i*ddisk,j,k)) # AU,mJy/beam,mJy/beam
-f.close()
+results.write_table("../cut_along_c_mod.dat",[x*ddisk,y,dy]) # AU,mJy/beam,mJy/beam
 sys.exit()
 
 
@@ -6,6 +6,7 @@ import matplotlib.gridspec as gridspec
 from astropy.io import fits
 from astropy.coordinates import Angle
 import astropy.units as u
+import results
 
 def get_profile(file,PA_disk,inc,d,padir,widir,dr):
     cube=imagecube(file,FOV=3)
@@ -40,10 +41,8 @@ plt.xlim(0,120)
 plt.show()
 #fig.savefig("/Users/users/bportilla/Documents/first_project/scripts/PDS70/reports/report:27-08-2020/06-coneobs.png")
 
-f=open("rp_cdir_mod.dat","w")
-for (i,j) in zip(x,y):
-    f.write("%.15e %.15e\n"%(i*ddisk,j))
-f.close()
+results.save_profile("rp_cdir_mod",[("r",x*ddisk),("b",y)],["AU","mJy/beam"])
+results.write_table("rp_cdir_mod.dat",[x*ddisk,y]) # also at its old place, as text
 sys.exit()
 
 
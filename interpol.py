@@ -2,70 +2,111 @@ import numpy as np
 import matplotlib.pyplot as plt
 import sys
 from scipy.interpolate import CubicSpline
+import results
 
-def modify_density():
+def spline_clamped(r,f,x):
 
     ############################################################
-    # Import data
-    data_obs=np.loadtxt("alma_radial_profile_observed.dat")
-    data_mod=np.loadtxt("../alma_radial_profile_modeled.dat")
+    #
+    # Cubic spline through (r,f) evaluated at x in one call.
+    # Outside [min(r),max(r)] the spline is clamped to its value
+    # at the nearest end instead of extrapolated. f may hold
+    # several profiles as columns, (len(r),k).
+    #
+    ############################################################
 
+    cs=CubicSpline(r,f)
+    return cs(np.clip(x,np.min(r),np.max(r)))
 
-    ############################################################
-    # Creating independent arrays
-    r_obs=np.reshape(data_obs[:,0:1],data_obs.shape[0])
-    f_obs=np.reshape(data_obs[:,1:2],data_obs.shape[0])
-    r_mod=np.reshape(data_mod[:,0:1],data_mod.shape[0])
-    f_mod=np.reshape(data_mod[:,1:2],data_mod.shape[0])
 
+def density_ratio(r,r_obs,f_obs,r_mod,f_mod,damping=1.0):
 
     ############################################################
-    # Prepare cubic spline interpolation
-    cs_obs=CubicSpline(r_obs,f_obs)
-    cs_mod=CubicSpline(r_mod,f_mod)
+    #
+    # Correction factors (f_obs/f_mod)**damping at the radii r
+    # of the density grid. Where either spline is not positive
+    # (the splines can undershoot to zero or below) the factor
+    # is 1, i.e. the density there is left unchanged.
+    #
+    # r_obs,f_obs: observed radial profile
+    # r_mod,f_mod: modeled radial profile. f_mod may be
+    # (len(r_mod),k) for k models at once, giving (len(r),k)
+    # factors
+    #
+    ############################################################
 
+    f_o=spline_clamped(r_obs,f_obs,r)
+    f_m=spline_clamped(r_mod,f_mod,r)
+    if f_m.ndim==2:
+        f_o=f_o[:,None]
+    f_o=np.broadcast_to(f_o,f_m.shape)
+    keep=(f_o>0)&(f_m>0)
+    ratio=np.ones(f_m.shape)
+    np.divide(f_o,f_m,out=ratio,where=keep)
+    return ratio**damping
 
-    ############################################################
-    # Determine limits for interpolation
-    if min(r_obs)<min(r_mod):
-        r_min=min(r_obs)
-    else:
-        r_min=min(r_mod)
 
-    if max(r_obs)>max(r_mod):
-        r_max=max(r_obs)
-    else:
-        r_max=max(r_mod)
+def modify_density(obs_file="alma_radial_profile_observed.dat",
+                   mod_file=results.path("alma_radial_profile_modeled"),
+                   density_file="../surface_density_PDS70.dat",
+                   damping=1.0):
 
+    ############################################################
+    #
+    # Multiplicative correction of the surface density by the
+    # ratio of the observed and modeled ALMA radial profiles.
+    #
+    # mod_file: modeled profile (results store), or a list of
+    # them to correct a batch of densities at once. The
+    # profiles of a batch must share the same radii
+    # density_file: (r,density) file. A batch holds one density
+    # column per modeled profile: (r,density_1,...,density_k)
+    # damping: exponent applied to the ratio. 1 gives the full
+    # correction, smaller values a damped step
+    #
+    # The density file is overwritten. Returns the radii of the
+    # density grid and the (damped) correction factors.
+    #
+    ############################################################
 
-    """
     ############################################################
-    # Do a check?
-    r=np.linspace(r_min,r_max,100)
-    plt.plot(r,cs_obs(r),label='observation interpolated',color='blue')
-    plt.plot(r,cs_mod(r),label='model interpolated',color='red')
-    plt.plot(r_obs,f_obs,'*',color='blue')
-    plt.plot(r_mod,f_mod,'*',color='red')
-    plt.legend()
-    plt.show()
-    """
+    # Import data
+    data_obs=np.loadtxt(obs_file)
+    r_obs=data_obs[:,0]
+    f_obs=data_obs[:,1]
+    if isinstance(mod_file,str):
+        data_mod=results.load_profile(mod_file)
+        r_mod=data_mod["r"]
+        f_mod=data_mod["b"]
+    else:
+        data_mod=[results.load_profile(file) for file in mod_file]
+        r_mod=data_mod[0]["r"]
+        for file,data in zip(mod_file,data_mod):
+            if not np.array_equal(data["r"],r_mod):
+                raise ValueError("%s is not on the radial grid of %s"%(file,mod_file[0]))
+        f_mod=np.column_stack([data["b"] for data in data_mod])
 
 
     ############################################################
     # Import initial density file
-    data_ini=np.loadtxt("../surface_density_PDS70.dat")
-    r_ini=np.reshape(data_ini[:,0:1],data_ini.shape[0])
-    d_ini=np.reshape(data_ini[:,1:2],data_ini.shape[0])
+    data_ini=np.loadtxt(density_file)
+    r_ini=data_ini[:,0]
+    d_ini=data_ini[:,1:]
 
 
     ############################################################
-    # Built R coefficients
-    R_array=[cs_obs(i)/cs_mod(i) for i in r_ini]
+    # Built R coefficients, all radii (and profiles) at once
+    R_array=density_ratio(r_ini,r_obs,f_obs,r_mod,f_mod,damping)
+    if not np.all(np.isfinite(R_array)):
+        raise ValueError("Non-finite density correction, %s left unchanged"%density_file)
 
 
     ############################################################
     # Built new density profile
-    d_new=[i*j for i,j in zip(d_ini,R_array)]
+    if R_array.ndim==1:
+        d_new=d_ini*R_array[:,None]
+    else:
+        d_new=d_ini*R_array
 
 
     """
@@ -79,13 +120,11 @@ def modify_density():
     plt.show()
     """
 
-    file=open("../surface_density_PDS70.dat",'w')
-    for i in range(0,len(r_ini)):
-        file.write("%.15e %.15e\n"%(r_ini[i],d_new[i]))
-    file.close()
+    results.write_table(density_file,[r_ini]+[d_new[:,k] for k in range(0,d_new.shape[1])])
 
-    return None
+    return r_ini,R_array
 
 
-modify_density()
+if __name__=="__main__":
+    modify_density()
 
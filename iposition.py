@@ -19,11 +19,11 @@ def ipos(PA_disk,ri,PAi):
     ############################################################
     
     # Poision vector of the object
-    thetai=((PAi+90)*u.deg).to(u.rad).value
+    thetai=np.deg2rad(np.add(PAi,90.0))
     posi=np.array([ri*np.cos(thetai),ri*np.sin(thetai)])
 
     # Rotation matrix
-    theta=((PA_disk-90)*u.deg).to(u.rad).value
+    theta=np.deg2rad(PA_disk-90.0)
     M=np.array([[np.cos(theta),np.sin(theta)],[-np.sin(theta),np.cos(theta)]])
     
     # Clockwise rotation by PAi
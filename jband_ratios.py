@@ -1,14 +1,15 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import sys
+import results
 
 def find_ratios():
 
 
     # Loading data
-    data=np.loadtxt("../jband_radial_profile_modeled.dat")
-    x=np.reshape(data[:,0:1],data.shape[0])
-    y=np.reshape(data[:,1:2],data.shape[0])
+    data=results.load_profile("jband_radial_profile_modeled")
+    x=data["r"]
+    y=data["b"]
     
 
     # Exctracting positive radius
@@ -43,9 +44,8 @@ def find_ratios():
     print("D2_error=%.2f percent"%(abs(D2_obs-D2_mod)/D2_obs * 100.0))
     print()
 
-    f=open("../ratios_jband_radial_flux.dat","w")
-    f.write("D1_error=%.2f percent \n"%(abs(D1_obs-D1_mod)/D1_obs * 100.0))
-    f.write("D2_error=%.2f percent \n"%(abs(D2_obs-D2_mod)/D2_obs * 100.0))
-    f.close()
+    results.write_text("../ratios_jband_radial_flux.dat",
+                       "D1_error=%.2f percent \nD2_error=%.2f percent \n"%(abs(D1_obs-D1_mod)/D1_obs * 100.0,
+                                                                           abs(D2_obs-D2_mod)/D2_obs * 100.0))
 
     return None
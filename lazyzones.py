@@ -0,0 +1,132 @@
+import os
+import glob
+import numpy as np
+from fitscache import open_fits
+
+
+############################################################
+#
+# Layout of the MCMax3D zone files (ZoneNNNN.fits).
+#
+# grid_hdu: cell edges, a (3,np+1,nt+1,nr+1) array holding
+# the r (AU), theta and phi (rad) edges
+# zone_layout: fieldname -> (hdu,plane) of the (np,nt,nr)
+# fields, plane None when the HDU holds the field alone
+#
+# A field whose HDU carries EXTNAME=fieldname is found by its
+# header instead.
+#
+############################################################
+
+grid_hdu=0
+zone_layout={'rhog':(1,None),'rhod':(2,None),'temp':(3,None)}
+
+
+class ZoneFields:
+
+    ############################################################
+    #
+    # One zone of LazyZones. An attribute (zone.temp, ...) is
+    # the memory-mapped block of that field in the zone file,
+    # resolved on first access, so slicing the midplane only
+    # pages in those planes. zone.r, zone.theta and zone.phi
+    # are the cell centres built from the 1D edges in the grid
+    # HDU, and zone.nr, zone.nt and zone.np come from its
+    # header. Arrays are ordered (phi,theta,r) as in mcmax3dpy.
+    #
+    ############################################################
+
+    _axes={'nr':'NAXIS1','nt':'NAXIS2','np':'NAXIS3'}
+    _coords={'phi':0,'theta':1,'r':2}
+
+    def __init__(self,hdulist,layout):
+        self._hdulist=hdulist
+        self._layout=layout
+
+
+    def __getattr__(self,name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._axes:
+            value=self._hdulist[grid_hdu].header[self._axes[name]]-1
+        elif name in self._coords:
+            value=self._centres(name)
+        else:
+            value=self._field(name)
+        setattr(self,name,value)
+        return value
+
+
+    def _centres(self,name):
+
+        ############################################################
+        # Cell centres of one coordinate, broadcast to (np,nt,nr).
+        # Only the edges along that axis are read
+        edges=self._hdulist[grid_hdu].data
+        axis=self._coords[name]
+        if name=='r':
+            e=np.array(edges[0,0,0,:],dtype=float)
+        elif name=='theta':
+            e=np.array(edges[1,0,:,0],dtype=float)
+        else:
+            e=np.array(edges[2,:,0,0],dtype=float)
+        shape=[1,1,1]
+        shape[axis]=len(e)-1
+        centres=(0.5*(e[:-1]+e[1:])).reshape(shape)
+        return np.broadcast_to(centres,(self.np,self.nt,self.nr))
+
+
+    def _field(self,name):
+        for hdu,block in enumerate(self._hdulist):
+            if str(block.header.get('EXTNAME','')).lower()==name.lower():
+                return block.data
+        if name not in self._layout:
+            raise AttributeError("zone files hold no field '%s'"%name)
+        hdu,plane=self._layout[name]
+        data=self._hdulist[hdu].data
+        return data if plane is None else data[plane]
+
+
+class LazyZones:
+
+    ############################################################
+    #
+    # Drop-in replacement for mread.read_zones(directory). The
+    # zone files (ZoneNNNN.fits.gz) are listed up front and
+    # nothing is read until a field of a zone is accessed. A
+    # field is then memory-mapped from its own block of the
+    # decompressed zone file in the fits cache (see
+    # zone_layout); the other fields are never read. No zone
+    # is ever parsed as a whole.
+    #
+    # directory: MCMax3D output folder
+    # layout: fieldname -> (hdu,plane), added to zone_layout
+    #
+    ############################################################
+
+    def __init__(self,directory,layout=None):
+        self.files=sorted(glob.glob(os.path.join(directory,"Zone[0-9][0-9][0-9][0-9].fits*")))
+        self.layout=dict(zone_layout)
+        self.layout.update(layout or {})
+        self._views={}
+
+
+    def __len__(self):
+        return len(self.files)
+
+
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i<0:
+            i+=len(self)
+        if i not in self._views:
+            if not 0<=i<len(self):
+                raise IndexError("zone index out of range")
+            self._views[i]=ZoneFields(open_fits(self.files[i]),self.layout)
+        return self._views[i]
+
+
+    def __iter__(self):
+        for i in range(0,len(self)):
+            yield self[i]
@@ -0,0 +1,118 @@
+import numpy as np
+from scipy import ndimage
+import geometry
+
+
+def cut_offsets(lim,step=1.0,center=True):
+
+    ############################################################
+    #
+    # Positions along a cut (px from the centre), as used for
+    # the rectangular apertures: the centre first, then
+    # np.arange(-lim,lim,step).
+    #
+    ############################################################
+
+    offsets=np.arange(-lim,lim,step)
+    if center:
+        offsets=np.concatenate(([0.0],offsets))
+    return offsets
+
+
+def sample_apertures(data,x,y,angle,length=1.0,width=1.0,method='bilinear',oversample=10):
+
+    ############################################################
+    #
+    # Mean of the image over rotated rectangular apertures,
+    # for all apertures in one array operation.
+    #
+    # data: 2D image
+    # x,y: centres of the apertures (px, pixel centres at
+    # integer positions as in photutils). Any shape
+    # angle: rotation of the apertures from the x-axis (rad),
+    # broadcastable to x
+    # length,width: size of the apertures along and across the
+    # cut (px)
+    # method: 'bilinear' averages bilinear samples (one per px)
+    # over the aperture; 'area' weights each pixel by the
+    # fraction of the aperture it covers, sampled on an
+    # oversample x oversample grid per px (as photutils'
+    # subpixel method)
+    #
+    # Parts of an aperture outside the image count as zero.
+    #
+    ############################################################
+
+    x=np.asarray(x,dtype=float)
+    y=np.asarray(y,dtype=float)
+    angle=np.broadcast_to(angle,x.shape)[...,None]
+
+    if method=='bilinear':
+        nl=max(int(round(length)),1)
+        nw=max(int(round(width)),1)
+    elif method=='area':
+        nl=max(int(np.ceil(length*oversample)),1)
+        nw=max(int(np.ceil(width*oversample)),1)
+    else:
+        raise ValueError("method must be 'bilinear' or 'area'")
+
+    # Sub-samples at the centres of an nl x nw grid on the aperture
+    u=((np.arange(nl)+0.5)/nl-0.5)*length
+    v=((np.arange(nw)+0.5)/nw-0.5)*width
+    u,v=[a.ravel() for a in np.meshgrid(u,v,indexing='ij')]
+    xs=x[...,None]+u*np.cos(angle)-v*np.sin(angle)
+    ys=y[...,None]+u*np.sin(angle)+v*np.cos(angle)
+
+    if method=='bilinear':
+        values=ndimage.map_coordinates(data,[ys.ravel(),xs.ravel()],order=1,
+                                       mode='constant',cval=0.0).reshape(xs.shape)
+    else:
+        i=np.floor(ys+0.5).astype(int)
+        j=np.floor(xs+0.5).astype(int)
+        inside=(i>=0)&(i<data.shape[0])&(j>=0)&(j<data.shape[1])
+        values=np.where(inside,data[np.clip(i,0,data.shape[0]-1),np.clip(j,0,data.shape[1]-1)],0.0)
+
+    return values.mean(axis=-1)
+
+
+def major_axis_cut(data,PA,lim,pxsize,d,center=None,width=1.0,length=1.0,step=1.0,method='bilinear'):
+
+    ############################################################
+    #
+    # Brightness along a cut through the star.
+    #
+    # data: 2D image
+    # PA: position angle of the cut measured east-north (deg).
+    # PA=90 is a cut along the x-axis. May be an array, for a
+    # fan of cuts
+    # lim: half length of the cut (AU)
+    # pxsize: pixel scale (arcsec/px)
+    # d: distance to the source (pc)
+    # center: (x,y) of the star (px). Default is the centre of
+    # the array, (0.5*columns-0.5,0.5*rows-0.5)
+    # width,length: aperture size across and along the cut (px)
+    # step: spacing of the apertures (px)
+    # method: see sample_apertures
+    #
+    # Returns the signed distance of each aperture (AU,
+    # positive for x<=x_centre whatever the PA, as
+    # geometry.to_au) and the mean brightness in it. For an
+    # array of PA both have shape (len(PA),apertures).
+    #
+    ############################################################
+
+    data=np.asarray(data,dtype=float)
+    if center is None:
+        center=(0.5*data.shape[1]-0.5,0.5*data.shape[0]-0.5)
+    au_px=geometry.scale(pxsize,d).au_px # AU/px
+    offsets=cut_offsets(lim/au_px,step)
+
+    angle=np.deg2rad(np.atleast_1d(np.asarray(PA,dtype=float))-90.0)[:,None]
+    x=center[0]+offsets*np.cos(angle)
+    y=center[1]+offsets*np.sin(angle)
+    brightness=sample_apertures(data,x,y,angle,length,width,method)
+    r_au=geometry.to_au(x,y,center[0],center[1],pxsize,d)
+
+    if np.ndim(PA)==0:
+        return r_au[0],brightness[0]
+    return r_au,brightness
@@ -1,5 +1,8 @@
 import numpy as np
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor
 from astropy import units
 from astropy.io import fits
 import matplotlib.pyplot as plt
@@ -9,45 +12,84 @@ from photutils import EllipticalAnnulus
 from astropy.convolution import convolve,Gaussian2DKernel
 from astropy.modeling.models import Rotation2D
 from scipy.ndimage.interpolation import rotate
+from fftconv import convolve_beam
+from fitscache import open_fits
 
-def convolve_image(data):
+def convolve_image(data,nan_treatment='interpolate'):
 
     # Start convolution
     pxsize=4.0 # mas/px
     beam_x=74.0 # mas
     beam_y=57.0 # mas
 
-    beam_x=beam_x/pxsize # px
-    beam_y=beam_y/pxsize # px
-
     PA=63.0
     angle=0.0#((PA+90.0)*units.deg).to(units.rad).value
 
-    kernel=Gaussian2DKernel(x_stddev=beam_x,y_stddev=beam_y,theta=angle)
-    convolved_data=convolve(data,kernel)
+    convolved_data=convolve_beam(data,beam_x,beam_y,angle,pxsize,nan_treatment)
 
     return convolved_data
 
-def convolve_image_jband(data):
+def convolve_image_jband(data,nan_treatment='interpolate'):
 
     # Start convolution
     pxsize=12.26 # mas/px
     beam_x=24.5 # (mas) 50% of the image resolution in px
     beam_y=beam_x # mas
 
-    beam_x=beam_x/pxsize
-    beam_y=beam_y/pxsize
-
-    #beam_x=beam_x/pxsize # px
-    #beam_y=beam_y/pxsize # px
-
     PA=63.0
     angle=1.94
 
-    kernel=Gaussian2DKernel(x_stddev=beam_x,y_stddev=beam_y,theta=angle)
-    convolved_data=convolve(data,kernel)
+    convolved_data=convolve_beam(data,beam_x,beam_y,angle,pxsize,nan_treatment)
 
     return convolved_data
     
 
 
+
+
+def _convolve_one(args):
+    func,item,plane=args
+    start=time.time()
+    if isinstance(item,str):
+        data=open_fits(item)[0].data
+        if plane is not None:
+            data=data[plane]
+    else:
+        data=item
+    convolved_data=func(data)
+    return convolved_data,time.time()-start
+
+
+def convolve_stack(images,func=convolve_image,plane=0,nworkers=None,processes=False):
+
+    ############################################################
+    #
+    # Convolve a stack of images on a pool of workers.
+    #
+    # images: (N,H,W) array or list of fits files
+    # func: convolution applied to each image, e.g.
+    # convolve_image or convolve_image_jband
+    # plane: plane of the fits data to use (None for 2D files)
+    # nworkers: size of the pool (default: number of CPUs)
+    # processes: use a process pool instead of threads. Threads
+    # are enough for in-memory stacks since the FFTs release the
+    # GIL; processes also spread the FITS decompression.
+    #
+    # Returns the (N,H,W) convolved stack and the time spent on
+    # each image (s).
+    #
+    ############################################################
+
+    if nworkers is None:
+        nworkers=os.cpu_count()
+    items=[(func,item,plane) for item in images]
+    Executor=ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with Executor(max_workers=nworkers) as pool:
+        results=list(pool.map(_convolve_one,items))
+
+    timing=np.array([dt for (_,dt) in results])
+    for i in range(0,len(items)):
+        label=items[i][1] if isinstance(items[i][1],str) else "image %d"%i
+        print("%s: %.2f s"%(label,timing[i]))
+
+    return np.array([out for (out,_) in results]),timing
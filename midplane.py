@@ -0,0 +1,193 @@
+import numpy as np
+
+
+def noisy_columns(T,threshold=3.0):
+
+    ############################################################
+    #
+    # Median/MAD selector of the radial columns of a midplane
+    # field. A column is noisy when its standard deviation along
+    # the azimuth lies more than threshold MADs away from the
+    # median standard deviation of all columns.
+    #
+    # T: (np,nr) midplane field
+    # threshold: cut in units of the MAD
+    #
+    # Returns the standard deviation of each column and two
+    # boolean masks, noisy and clean. Columns where the
+    # selector is undefined (MAD=0 and std=median) are in
+    # neither.
+    #
+    ############################################################
+
+    std=np.std(T,axis=0)
+    median=np.median(std)
+    mad=np.median(np.abs(std-median))
+    with np.errstate(invalid='ignore',divide='ignore'):
+        selector=np.abs(std-median)/mad
+        noisy=selector>=threshold
+        clean=selector<threshold
+    return std,noisy,clean
+
+
+def reduce_zone(T,R,rows,rmax,threshold=3.0):
+
+    ############################################################
+    #
+    # Radial temperature profile of one zone from its (np,nr)
+    # midplane.
+    #
+    # T: (np,nr) midplane temperature
+    # R: (np,nr) radial coordinate (AU)
+    # rows: slice of azimuthal rows (the cone) averaged for the
+    # clean columns
+    # rmax: noisy columns are only merged up to this radius (AU)
+    # threshold: see noisy_columns
+    #
+    # Clean columns are averaged over the cone. Noisy columns
+    # inside rmax are averaged over the full azimuth and merged
+    # into one point at the middle of their radial span, which
+    # is appended last.
+    #
+    ############################################################
+
+    std,noisy,clean=noisy_columns(T,threshold)
+    inside=np.nonzero(rmax>=R[0])[0]
+    imax=inside[-1] if len(inside) else -1
+    noisy&=np.arange(T.shape[1])<=imax
+
+    T_tot=T[rows][:,clean].mean(axis=0)
+    R_tot=R[0][clean]
+
+    j_noisy=np.nonzero(noisy)[0]
+    if len(j_noisy)!=0:
+        T_noisy=T[:,j_noisy].mean(axis=0).mean()
+        R_noisy=(R[0][j_noisy[-1]]-R[0][j_noisy[0]])*0.5+R[0][j_noisy[0]]
+        T_tot=np.append(T_tot,T_noisy)
+        R_tot=np.append(R_tot,R_noisy)
+
+    return R_tot,T_tot
+
+
+def radial_bins(R,width=1.0,log=False):
+
+    ############################################################
+    #
+    # Bin index and lower edge of the bin of each radius.
+    #
+    # R: radii (AU)
+    # width: bin width, in AU for linear bins or in dex for
+    # log bins. width=1 in linear bins groups points with the
+    # same integer AU.
+    # log: use log10 bins
+    #
+    ############################################################
+
+    if log:
+        key=np.floor(np.log10(R)/width).astype(int)
+        return key,10.0**(key*width)
+    key=np.floor(R/width).astype(int)
+    return key,key*width
+
+
+def smooth_profile(R_cut,T_cut,T_col,width=1.0,log=False,rmin=20.0):
+
+    ############################################################
+    #
+    # Smoothing of a radial cut. Consecutive points of the cut
+    # that fall in the same radial bin (beyond rmin) are
+    # replaced by the average of the azimuthally averaged field
+    # over the columns spanning that bin, and their radius by
+    # the lower edge of the bin. Other points are kept.
+    #
+    # R_cut,T_cut: radius (AU) and field along the cut
+    # T_col: azimuthal average of each column, same length
+    # width,log: see radial_bins
+    # rmin: points inside this radius are not merged (AU)
+    #
+    # Groups are found with one sort, np.unique and
+    # np.minimum/maximum.reduceat; averages come from a
+    # cumulative sum. Returns (T,R) with the length of the cut.
+    #
+    ############################################################
+
+    R_cut=np.asarray(R_cut,dtype=float)
+    T_cut=np.asarray(T_cut,dtype=float)
+    key,edge=radial_bins(R_cut,width,log)
+
+    # Bins holding two consecutive points, the first beyond rmin
+    pair=(key[:-1]==key[1:])&(R_cut[:-1]>=rmin)
+    order=np.argsort(key,kind='stable')
+    uniq,first=np.unique(key[order],return_index=True)
+    common=np.isin(uniq,key[:-1][pair])
+
+    # Column span and average of each bin
+    jmin=np.minimum.reduceat(order,first)
+    jmax=np.maximum.reduceat(order,first)
+    csum=np.concatenate(([0.0],np.cumsum(T_col)))
+    Tave=(csum[jmax+1]-csum[jmin])/(jmax-jmin+1)
+
+    group=np.searchsorted(uniq,key)
+    merged=common[group]
+    T_smooth=np.where(merged,Tave[group],T_cut)
+    R_smooth=np.where(merged,edge,R_cut)
+    return T_smooth,R_smooth
+
+
+def azimuthal_weights(phi,phi_out):
+
+    ############################################################
+    #
+    # Periodic linear interpolation from the azimuthal grid phi
+    # onto phi_out (rad).
+    #
+    # Returns the two rows bracketing each output angle and the
+    # weight of the second one, so a whole (np,nr) array is
+    # interpolated as f[i0]*(1-w)+f[i1]*w.
+    #
+    ############################################################
+
+    order=np.argsort(phi)
+    ext=np.concatenate((phi[order[-1:]]-2*np.pi,phi[order],phi[order[:1]]+2*np.pi))
+    rows=np.concatenate((order[-1:],order,order[:1]))
+    x=np.mod(phi_out,2*np.pi)
+    k=np.clip(np.searchsorted(ext,x,side='right')-1,0,len(ext)-2)
+    w=(x-ext[k])/(ext[k+1]-ext[k])
+    return rows[k],rows[k+1],w
+
+
+def stitch_zones(fields,radii,phis):
+
+    ############################################################
+    #
+    # Concatenate the (np,nr) midplanes of several zones along
+    # the radial axis. Zones may have any nr and np: all are
+    # put on the azimuthal grid of the zone with the largest
+    # np, interpolating (periodically) the ones that differ.
+    #
+    # fields,radii,phis: lists with the field, radius and
+    # azimuth midplane of each zone
+    #
+    # Returns the stitched field, R and Phi, each of shape
+    # (np,sum of nr).
+    #
+    ############################################################
+
+    ref=int(np.argmax([f.shape[0] for f in fields]))
+    phi_out=phis[ref][:,0]
+
+    T,R=[],[]
+    for f,r,p in zip(fields,radii,phis):
+        if f.shape[0]==len(phi_out) and np.allclose(p[:,0],phi_out):
+            T.append(f)
+            R.append(r)
+        else:
+            i0,i1,w=azimuthal_weights(p[:,0],phi_out)
+            w=w[:,None]
+            T.append(f[i0]*(1-w)+f[i1]*w)
+            R.append(r[i0]*(1-w)+r[i1]*w)
+
+    T=np.concatenate(T,axis=1)
+    R=np.concatenate(R,axis=1)
+    P=np.broadcast_to(phi_out[:,None],T.shape).copy()
+    return T,R,P
@@ -0,0 +1,210 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from astropy.io import fits
+from fitscache import content_hash
+
+
+############################################################
+# Columns of a particle table: wavelength, then the three
+# opacities mixed by the engine
+quantities=("ext","abs","sca")
+
+
+############################################################
+# Folder holding the mixed opacities of previous runs, one
+# .npz per set of grain parameters and particle files
+cache_dir=os.environ.get("OPACITY_CACHE_DIR",os.path.join(os.path.expanduser("~"),".cache","opacity"))
+
+
+def particle_zone(filename):
+    return int(filename[8:12])
+
+
+def read_particle(path):
+
+    ############################################################
+    #
+    # Read one particle file (../Particles/*.fits.gz).
+    #
+    # Returns the table with one row per wavelength and columns
+    # (wl,ext,abs,sca,...) and the (R_MIN,R_MAX,R_POW) of the
+    # size bin.
+    #
+    ############################################################
+
+    hdulist=fits.open(path)
+    hdr=hdulist[0].header
+    table=np.transpose(np.asarray(hdulist[0].data,dtype=float))
+    hdulist.close()
+    return table,(hdr["R_MIN"],hdr["R_MAX"],hdr["R_POW"])
+
+
+def particle_weight(amin_bin,amax_bin,apow,amin,amax):
+
+    ############################################################
+    #
+    # Mass fraction of the size bin [amin_bin,amax_bin] in a
+    # power-law size distribution with exponent apow between
+    # amin and amax. Works on arrays.
+    #
+    ############################################################
+
+    f_num=amax_bin**(-apow+4)-amin_bin**(-apow+4)
+    f_den=amax**(-apow+4)-amin**(-apow+4)
+    return f_num/f_den
+
+
+def stack_particles(tables,zones,Nzones):
+
+    ############################################################
+    #
+    # Stack particle tables into one array.
+    #
+    # tables: iterable of (table,(R_MIN,R_MAX,R_POW)) as
+    # returned by read_particle. It is consumed as it comes, so
+    # a generator fed by a worker pool streams straight into
+    # the arrays.
+    # zones: zone (1..Nzones) of each table
+    #
+    # Returns the wavelength grid, the (zone,grain,wavelength,
+    # quantity) array of opacities and the (zone,grain) arrays
+    # of R_MIN, R_MAX and R_POW. Unused grain slots are zero.
+    #
+    ############################################################
+
+    zones=np.asarray(zones)
+    Ngrains=max(np.bincount(zones,minlength=Nzones+1)[1:].max(),1)
+
+    kappa=None
+    rbins=np.zeros((3,Nzones,Ngrains))
+    slot=np.zeros(Nzones,dtype=int)
+    for (table,rbin),z in zip(tables,zones):
+        if kappa is None:
+            wl=table[:,0]
+            kappa=np.zeros((Nzones,Ngrains,len(wl),len(quantities)))
+        j=slot[z-1]
+        kappa[z-1,j]=table[:,1:1+len(quantities)]
+        rbins[:,z-1,j]=rbin
+        slot[z-1]+=1
+
+    return wl,kappa,rbins
+
+
+def mix(kappa,rbins,psizes):
+
+    ############################################################
+    #
+    # Size-distribution weighted sum over grains, for all zones,
+    # wavelengths and quantities in one reduction.
+    #
+    # kappa: (zone,grain,wavelength,quantity) opacities
+    # rbins: (3,zone,grain) R_MIN, R_MAX and R_POW of each grain
+    # psizes: list of (amin,amax) of each zone
+    #
+    # Returns the (zone,wavelength,quantity) mixed opacities.
+    #
+    ############################################################
+
+    amin=np.array([p[0] for p in psizes])[:,None]
+    amax=np.array([p[1] for p in psizes])[:,None]
+    used=rbins[1]>0.0
+    with np.errstate(invalid='ignore',divide='ignore'):
+        weights=np.where(used,particle_weight(rbins[0],rbins[1],rbins[2],amin,amax),0.0)
+    return np.einsum('zg,zgwq->zwq',weights,kappa)
+
+
+def load_particles(folder,filenames,Nzones,nworkers=None):
+
+    ############################################################
+    #
+    # Read the particle files on a pool of nworkers threads
+    # (default: number of CPUs) and stack them as they arrive.
+    # Decompression runs in zlib, which releases the GIL, so
+    # the files are gunzipped in parallel. Threads are used
+    # rather than processes so that scripts without a __main__
+    # guard, like pprop.py, can call this.
+    #
+    ############################################################
+
+    paths=[os.path.join(folder,filename) for filename in filenames]
+    zones=[particle_zone(filename) for filename in filenames]
+    with ThreadPoolExecutor(max_workers=nworkers) as pool:
+        return stack_particles(pool.map(read_particle,paths),zones,Nzones)
+
+
+def mix_key(folder,filenames,psizes,apows,Nbins,fvSI,fvC):
+
+    ############################################################
+    #
+    # Cache key of a mix: SHA-1 of the grain parameters of
+    # every zone (amin,amax,apow,ngrains), of the silicate and
+    # carbon fractions and of the content of each particle
+    # file. The order of the files does not matter.
+    #
+    ############################################################
+
+    h=hashlib.sha1()
+    for i in range(0,len(psizes)):
+        h.update(repr((float(psizes[i][0]),float(psizes[i][1]),float(apows[i]),int(Nbins[i]))).encode())
+    h.update(repr((str(fvSI),str(fvC))).encode())
+    for filename in sorted(filenames):
+        h.update(filename.encode())
+        h.update(content_hash(os.path.join(folder,filename)).encode())
+    return h.hexdigest()
+
+
+def cached_mix(folder,filenames,Nzones,psizes,apows,Nbins,fvSI,fvC,nworkers=None):
+
+    ############################################################
+    #
+    # load_particles followed by mix, with the result kept in
+    # cache_dir. A run with the same grain parameters and the
+    # same particle files reads the mixed opacities back instead
+    # of opening the particle tables. The .npz is written to a
+    # temporary file and renamed, so concurrent runs never see
+    # a half-written entry.
+    #
+    # Returns the wavelength grid and the (zone,wavelength,
+    # quantity) mixed opacities.
+    #
+    ############################################################
+
+    key=mix_key(folder,filenames,psizes,apows,Nbins,fvSI,fvC)
+    target=os.path.join(cache_dir,key+".npz")
+    if os.path.exists(target):
+        with np.load(target) as f:
+            return f["wl"],f["mixed"]
+
+    wl,kappa,rbins=load_particles(folder,filenames,Nzones,nworkers)
+    mixed=mix(kappa,rbins,psizes)
+
+    os.makedirs(cache_dir,exist_ok=True)
+    fd,tmp=tempfile.mkstemp(dir=cache_dir,suffix=".tmp")
+    try:
+        with os.fdopen(fd,"wb") as fout:
+            np.savez(fout,wl=wl,mixed=mixed)
+        os.replace(tmp,target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return wl,mixed
+
+
+def write_opacities(wl,mixed,folder='..'):
+
+    ############################################################
+    #
+    # Write ext.fits, abs.fits and sca.fits. Each holds one row
+    # per wavelength with columns (wl,zone1,zone2,...).
+    #
+    ############################################################
+
+    for k in range(0,len(quantities)):
+        table=np.column_stack([wl]+[mixed[z,:,k] for z in range(0,mixed.shape[0])])
+        hdu=fits.PrimaryHDU(table)
+        hdu.writeto(os.path.join(folder,'%s.fits'%quantities[k]),overwrite=True)
+
+    return None
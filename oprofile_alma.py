@@ -5,6 +5,8 @@ from astropy.io import fits
 from photutils import EllipticalAnnulus,CircularAnnulus,EllipticalAperture
 from photutils import aperture_photometry
 import sys
+import rprofile
+import results
 plt.style.use('fancy')
 
 
@@ -34,47 +36,14 @@ pixel_lim=int(round(angular_lim/pxsize)) # pixel
 
 
 ############################################################
-# Set up aperture photometry
+# Radial profile: mean brightness of each elliptical annulus,
+# all annuli reduced in one pass
 xc=0.5*data_obs.shape[0] # Image center in data coordinates
 yc=0.5*data_obs.shape[1] # Image center in data coordinates
-dr=1 # Width of the annulus
-a_in_array=[]
-for i in np.arange(yc+0.001,yc+0.5*pixel_lim+0.001,dr):
-    a_in_array.append(i-xc)
-a_out_array=[i+dr for i in a_in_array]
-b_out_array=[i*(1-e**2)**0.5 for i in a_out_array]
-apertures=[EllipticalAnnulus((yc,xc),a_in=ain,a_out=aout,b_out=bout,theta=angle_annulus)
-           for (ain,aout,bout) in zip(a_in_array,a_out_array,b_out_array)]
-"""
-# Do a check
-aperture=apertures[-1]
-plt.imshow(data_obs)
-aperture.plot(color='red',lw=1)
-plt.show()
-"""
-
-
-# Radial distance of each annulus
-r_arcsec=[(j+0.5*(i-j))*pxsize for (i,j) in zip(a_out_array,a_in_array)] # arcsec
-r_rad=[(i*units.arcsec).to(units.rad).value for i in r_arcsec] # rad
-r_au=[((i*d)*units.pc).to(units.au).value for i in r_rad] # AU
-
-
-# Creating numpy arrays
-r_au=np.array(r_au)
-r_arcsec=np.array(r_arcsec)
-
-
-############################################################
-# Doing photometry
-phot_table=aperture_photometry(data_obs,apertures)
-col_values=[]
-for col in phot_table.colnames:
-    col_values.append(phot_table[col][0])
-brightness=[col_values[i] for i in range(3,len(col_values))]
-brightness=np.array(brightness)
-for i in range(0,len(brightness)):
-    brightness[i]=brightness[i]/apertures[i].area
+dr=1 # Width of the annulus (px)
+au_px=pxsize*d # AU/px
+r_au,brightness,npix=rprofile.radial_profile(data_obs,pxsize,d,theta,PA_disk,
+                                             dr*au_px,0.001*au_px,(0.5*pixel_lim+0.001)*au_px)
 """
 # Do a check?
 fig=plt.figure()
@@ -109,13 +78,7 @@ r_max=d*r_max
 
 ############################################################
 # Writing files
-f1=open("info_max_alma_obs.dat","w")
-f2=open("alma_radial_profile_observed.dat","w")
-f1.write("r_max=%.2f (AU)\n"%r_max)
-f1.write("PA_max=%.2f (deg)\n"%PA_max)
-f1.write("B_max=%.15f (mJy/beam)\n"%maxval)
-for i in range(0,len(r_au)):
-    f2.write("%.5e %.5e \n"%(r_au[i],brightness[i]/max(brightness)))
-f1.close()
-f2.close()
+results.write_text("info_max_alma_obs.dat",
+                   "r_max=%.2f (AU)\nPA_max=%.2f (deg)\nB_max=%.15f (mJy/beam)\n"%(r_max,PA_max,maxval))
+results.write_table("alma_radial_profile_observed.dat",[r_au,brightness/max(brightness)],line="%.5e %.5e \n")
 
@@ -0,0 +1,144 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor,wait,FIRST_COMPLETED
+from fitscache import content_hash
+
+
+class Stage:
+
+    ############################################################
+    #
+    # One step of the analysis.
+    #
+    # name: unique name of the stage
+    # func: called as func(*args)
+    # inputs: files read by the stage
+    # outputs: files written by the stage
+    # args: arguments of func. They are part of the stage's
+    # fingerprint, so changing them reruns the stage
+    # main_thread: run in the calling thread (stages that plot)
+    #
+    # A stage depends on every stage that writes one of its
+    # inputs.
+    #
+    ############################################################
+
+    def __init__(self,name,func,inputs=(),outputs=(),args=(),main_thread=False):
+        self.name=name
+        self.func=func
+        self.inputs=list(inputs)
+        self.outputs=list(outputs)
+        self.args=tuple(args)
+        self.main_thread=main_thread
+
+
+    def fingerprint(self):
+
+        ############################################################
+        # Hashes of the inputs (None for missing files) and the
+        # arguments
+        key=[content_hash(path) if os.path.exists(path) else None for path in self.inputs]
+        return key+[repr(self.args)]
+
+
+class Pipeline:
+
+    ############################################################
+    #
+    # Incremental runner of a set of stages. A stage is skipped
+    # when all its outputs exist and its fingerprint is the one
+    # recorded after its last run. Stages whose dependencies are
+    # done run concurrently on a thread pool, so independent
+    # branches (ALMA and J-band) overlap.
+    #
+    # stages: list of Stage
+    # state_file: json file with the fingerprints of the last run
+    #
+    ############################################################
+
+    def __init__(self,stages,state_file='../pipeline_state.json'):
+        self.stages={stage.name:stage for stage in stages}
+        self.state_file=state_file
+        self.state={}
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                self.state=json.load(f)
+        self._lock=threading.Lock()
+
+        writer={}
+        for stage in stages:
+            for path in stage.outputs:
+                writer[os.path.abspath(path)]=stage.name
+        self.deps={}
+        for stage in stages:
+            self.deps[stage.name]={writer[os.path.abspath(path)] for path in stage.inputs
+                                   if os.path.abspath(path) in writer}-{stage.name}
+
+
+    def _save(self):
+        tmp=self.state_file+'.tmp'
+        with open(tmp,'w') as f:
+            json.dump(self.state,f,indent=1)
+        os.replace(tmp,self.state_file)
+
+
+    def _run_stage(self,name,force):
+
+        ############################################################
+        # Run one stage unless it is up to date. Returns True if
+        # it ran.
+        stage=self.stages[name]
+        key=stage.fingerprint()
+        uptodate=(stage.outputs and all(os.path.exists(path) for path in stage.outputs)
+                  and self.state.get(name)==key)
+        if uptodate and not force:
+            print("Stage %s: up to date, skipped"%name)
+            return False
+        print("Stage %s: running"%name)
+        stage.func(*stage.args)
+        with self._lock:
+            self.state[name]=key
+            self._save()
+        return True
+
+
+    def run(self,nworkers=2,force=False):
+
+        ############################################################
+        #
+        # nworkers: number of stages running at the same time
+        # force: run every stage
+        #
+        # Returns the names of the stages that ran.
+        #
+        ############################################################
+
+        pending=set(self.stages)
+        done=set()
+        ran=[]
+        running={}
+        with ThreadPoolExecutor(max_workers=nworkers) as pool:
+            while pending or running:
+                ready=[name for name in sorted(pending) if self.deps[name]<=done]
+                for name in ready:
+                    pending.discard(name)
+                    if self.stages[name].main_thread:
+                        if self._run_stage(name,force):
+                            ran.append(name)
+                        done.add(name)
+                    else:
+                        running[pool.submit(self._run_stage,name,force)]=name
+                if any(self.deps[name]<=done for name in pending):
+                    continue
+                if not running:
+                    if pending:
+                        raise RuntimeError("Cyclic dependencies between stages: %s"%sorted(pending))
+                    break
+                finished,_=wait(running,return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name=running.pop(future)
+                    if future.result():
+                        ran.append(name)
+                    done.add(name)
+        return ran
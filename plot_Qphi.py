@@ -2,7 +2,6 @@ from scipy import misc
 import scipy
 import numpy as np
 import sys
-from astropy import units
 from astropy.io import fits
 import matplotlib.pyplot as plt
 import sys
@@ -10,6 +9,8 @@ from mcmax3d_analysis.mcmax3d_observables import convert_flux,convert_flux_data
 from mcmax3d_analysis.mcmax3d_image import display_image
 from mcmax3d_analysis.mcmax3d_convolution import convolve_model
 from astropy.convolution import Gaussian2DKernel
+from runconfig import load_config
+import geometry
 import matplotlib.gridspec as gridspec
 import matplotlib.ticker as ticker
 from matplotlib.ticker import ScalarFormatter
@@ -30,17 +31,7 @@ def pivot(data,pxsize):
     xc=data.shape[1]*0.5
     yc=data.shape[0]*0.5
     d=113.43
-    r=((54.64)*units.au).to(units.pc).value # pc
-    r=((r/d)*units.rad).to(units.arcsec).value # arcsec
-    r=r/pxsize #px
-    PA=((158.6+90)*units.deg).to(units.rad).value # w.r.t. x-axis 
-    
-    
-    xp=r*np.cos(PA)
-    yp=r*np.sin(PA)
-
-    x=xp+xc
-    y=yp+yc
+    x,y=geometry.to_xy(54.64,158.6,xc,yc,pxsize,d)
 
     return (x,y,data[int(round(y)),int(round(x))])
     
@@ -85,15 +76,8 @@ def make_plot(observation,model,**kwargs):
     
     ############################################################
     # Derive peak value of model
-    imfile=open("../Image_jband.out").readlines()
-    for line in imfile:
-        if line.split('=')[0]=='MCobs:fov':
-            fov=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:npix':
-            npix=float(line.split('=')[1].split('!')[0])
-        else:
-            continue
-    pxsizemod=fov/npix # pixel scale model (arcsec/px)
+    cfg=load_config("../Image_jband.out",input_file=None)
+    pxsizemod=cfg.pxsize # pixel scale model (arcsec/px)
     xmax_mod=pivot(data_mod,pxsizemod)[0]
     ymax_mod=pivot(data_mod,pxsizemod)[1]
     Bmax_mod=pivot(data_mod,pxsizemod)[2]
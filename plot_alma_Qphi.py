@@ -2,11 +2,12 @@ from scipy import misc
 import scipy
 import numpy as np
 import sys
-from astropy import units
 from astropy.io import fits
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import matplotlib.ticker as ticker
+from runconfig import load_config
+import geometry
 from matplotlib.ticker import ScalarFormatter
 from matplotlib.ticker import FuncFormatter
 from mpl_toolkits.axes_grid1.inset_locator import zoomed_inset_axes
@@ -31,17 +32,7 @@ def pivot(data,pxsize):
     xc=data.shape[1]*0.5
     yc=data.shape[0]*0.5
     d=113.43
-    r=((54.64)*units.au).to(units.pc).value # pc
-    r=((r/d)*units.rad).to(units.arcsec).value # arcsec
-    r=r/pxsize #px
-    PA=((158.6+90)*units.deg).to(units.rad).value # w.r.t. x-axis 
-    
-    
-    xp=r*np.cos(PA)
-    yp=r*np.sin(PA)
-
-    x=xp+xc
-    y=yp+yc
+    x,y=geometry.to_xy(54.64,158.6,xc,yc,pxsize,d)
 
     return (x,y,data[int(round(y)),int(round(x))])
     
@@ -95,15 +86,8 @@ def make_plot(observation_alma,maxobs_alma,pxsizeobs_alma,model_alma,maxmod_alma
 
     ############################################################
     # Derive peak value of model
-    imfile=open("../Image_jband.out").readlines()
-    for line in imfile:
-        if line.split('=')[0]=='MCobs:fov':
-            fov_Qphi=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:npix':
-            npix_Qphi=float(line.split('=')[1].split('!')[0])
-        else:
-            continue
-    pxsizemod_Qphi=fov_Qphi/npix_Qphi # pixel scale model (arcsec/px)
+    cfg=load_config("../Image_jband.out",input_file=None)
+    pxsizemod_Qphi=cfg.pxsize # pixel scale model (arcsec/px)
     xmax_mod_Qphi=pivot(data_mod_Qphi,pxsizemod_Qphi)[0]
     ymax_mod_Qphi=pivot(data_mod_Qphi,pxsizemod_Qphi)[1]
     Bmax_mod_Qphi=pivot(data_mod_Qphi,pxsizemod_Qphi)[2]
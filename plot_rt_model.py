@@ -9,6 +9,7 @@ from photutils import EllipticalAnnulus
 from mcmax3d_analysis.mcmax3d_observables import convert_flux
 from photutils import aperture_photometry
 from mcmax3d_analysis.mcmax3d_convolution import convolve_observation
+import results
 plt.style.use('fancy')
 
 
@@ -56,13 +57,13 @@ r_obs_j_1=odata_j_1[:,0:1]
 b_obs_j_1=odata_j_1[:,1:2]
 
 
-mprofile_alma=np.loadtxt(sim+"/alma_radial_profile_modeled.dat")
-r_alma=np.reshape(mprofile_alma[:,0:1],mprofile_alma.shape[0])
-b_alma=np.reshape(mprofile_alma[:,1:2],mprofile_alma.shape[0])
+mprofile_alma=results.load_profile("alma_radial_profile_modeled",sim+"/results")
+r_alma=mprofile_alma["r"]
+b_alma=mprofile_alma["b"]
 
-mprofile_jband=np.loadtxt(sim+"/jband_radial_profile_modeled.dat")
-r_jband_complete=np.reshape(mprofile_jband[:,0:1],mprofile_jband.shape[0])
-b_jband_complete=np.reshape(mprofile_jband[:,1:2],mprofile_jband.shape[0])
+mprofile_jband=results.load_profile("jband_radial_profile_modeled",sim+"/results")
+r_jband_complete=mprofile_jband["r"]
+b_jband_complete=mprofile_jband["b"]
 
 r_jband=r_jband_complete
 b_jband=b_jband_complete
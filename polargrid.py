@@ -0,0 +1,198 @@
+import os
+import numpy as np
+from collections import OrderedDict
+from fitscache import open_fits
+import geometry
+
+
+############################################################
+# LRU cache of the polar grids already built, keyed on the
+# file (path and modification time) and on the grid
+# parameters, bounded by memory (bytes)
+grid_cache_limit=512*1024**2
+_grid_cache=OrderedDict()
+_grid_cache_size=0
+
+
+def grouped_std(index,values,n):
+
+    ############################################################
+    #
+    # Standard deviation (ddof=0, as np.std) of the values that
+    # share the same index, for all groups at once. Two passes
+    # of np.bincount: group means, then squared deviations.
+    #
+    # index: group of each value (0<=index<n)
+    # values: values to reduce
+    # n: number of groups
+    #
+    # Returns the standard deviation and the number of values
+    # of each group. Empty groups get nan.
+    #
+    ############################################################
+
+    npix=np.bincount(index,minlength=n)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        mean=np.bincount(index,weights=values,minlength=n)/npix
+        dev=values-mean[index]
+        var=np.bincount(index,weights=dev*dev,minlength=n)/npix
+    return np.sqrt(var),npix
+
+
+class PolarGrid:
+
+    ############################################################
+    #
+    # Deprojected polar grid of an ALMA image: the annulus
+    # (ring) index and the position angle of every pixel inside
+    # the elliptical annuli used by radsyma and radsyma1d.
+    #
+    # file: the fits file of the image
+    # pxsize: pixel scale (arcsec/px)
+    # PA_disk: position angle of the disk measured east-north (deg)
+    # inc: disk's inclination (deg)
+    # d: distance to the source (pc)
+    # size: semi-major axis of the disk (AU)
+    # dr: width of the annulus (AU)
+    # widir: width of the position angle bins (deg)
+    # type: 'obs' or 'mod'
+    # center: 'shape' puts the star at the centre of the array,
+    # 'crpix' reads it from CRPIX1 (x, column) and CRPIX2 (y,
+    # row), converted from 1-based FITS to 0-based pixels
+    #
+    # Only pixels inside the annuli and different from zero are
+    # kept, as flat arrays ordered by (PA bin, ring) cell.
+    #
+    ############################################################
+
+    def __init__(self,file,pxsize,PA_disk,inc,d,size,dr,widir,type,center='shape'):
+
+        ############################################################
+        # Load ALMA data
+        hdulist=open_fits(file)
+        if type=='obs':
+            data=hdulist[0].data[0][0]
+        elif type=='mod':
+            data=hdulist[0].data
+        if center=='crpix':
+            x0=hdulist[0].header['CRPIX1']-1.0
+            y0=hdulist[0].header['CRPIX2']-1.0
+        else:
+            x0=data.shape[1]*0.5
+            y0=data.shape[0]*0.5
+        data=np.asarray(data,dtype=float)
+
+
+        ############################################################
+        # Annuli
+        angle_annulus=np.deg2rad(PA_disk-90.0)
+        cosi=np.cos(np.deg2rad(inc))
+        linear_lim=2*(size) # AU
+        pixel_lim=int(round(geometry.to_px(linear_lim,pxsize,d)))
+        dr=dr/(pxsize*d) # width of each annular aperture (px)
+        self.a_in=np.arange(dr,0.5*pixel_lim,dr) # px
+        self.a_out=self.a_in+dr # px
+        self.area=np.pi*(self.a_out**2-self.a_in**2)*cosi # px^2
+        self.a_mid=(self.a_in+0.5*dr)*pxsize*d # AU
+        self.Nring=len(self.a_in)
+        self.Nbins=int(round(360.0/widir))
+        self.pxsize=pxsize
+
+
+        ############################################################
+        # Ring index and position angle of every pixel
+        x=np.arange(data.shape[1],dtype=float)-x0
+        y=np.arange(data.shape[0],dtype=float)-y0
+        xp=x[None,:]*np.cos(angle_annulus)+y[:,None]*np.sin(angle_annulus)
+        yp=-x[None,:]*np.sin(angle_annulus)+y[:,None]*np.cos(angle_annulus)
+        r=np.hypot(xp,yp/cosi)
+        ring=np.floor((r-self.a_in[0])/dr).astype(int)
+        keep=(ring>=0)&(ring<self.Nring)&(data!=0.0)
+
+        phi=np.degrees(np.arctan2(y[:,None],x[None,:]))%360.0
+        pabin=np.minimum((phi*(self.Nbins/360.0)).astype(int),self.Nbins-1)
+
+        cell=(pabin*self.Nring+ring)[keep]
+        order=np.argsort(cell,kind='stable')
+        self.cell=cell[order]
+        self.ring=ring[keep][order]
+        self.angle=phi[keep][order] # deg, counterclockwise from the x-axis
+        self.values=data[keep][order]
+        self.nbytes=self.cell.nbytes+self.ring.nbytes+self.angle.nbytes+self.values.nbytes
+
+
+    def cells(self):
+
+        ############################################################
+        #
+        # Sum and number of pixels of every (PA bin, ring) cell.
+        # Both are returned as (Nbins,Nring) matrices.
+        #
+        ############################################################
+
+        ncell=self.Nbins*self.Nring
+        flux=np.bincount(self.cell,weights=self.values,minlength=ncell)
+        npix=np.bincount(self.cell,minlength=ncell)
+        return flux.reshape(self.Nbins,self.Nring),npix.reshape(self.Nbins,self.Nring)
+
+
+    def cell_std(self):
+
+        ############################################################
+        #
+        # Standard deviation and number of pixels of every
+        # (PA bin, ring) cell, as (Nbins,Nring) matrices.
+        #
+        ############################################################
+
+        std,npix=grouped_std(self.cell,self.values,self.Nbins*self.Nring)
+        return std.reshape(self.Nbins,self.Nring),npix.reshape(self.Nbins,self.Nring)
+
+
+    def cone(self,PAmin,PAmax):
+
+        ############################################################
+        #
+        # Pixels inside the cone PAmin<=angle<PAmax (deg, measured
+        # as self.angle, wrapping around 360).
+        #
+        # Returns the ring index and value of those pixels.
+        #
+        ############################################################
+
+        inside=((self.angle-PAmin)%360.0)<(PAmax-PAmin)
+        return self.ring[inside],self.values[inside]
+
+
+def get_grid(file,pxsize,PA_disk,inc,d,size,dr,widir,type,center='shape'):
+
+    ############################################################
+    #
+    # Memoized PolarGrid. Calls on the same (unchanged) file
+    # with the same parameters share one grid. The least
+    # recently used grids are dropped once the cache holds more
+    # than grid_cache_limit bytes.
+    #
+    ############################################################
+
+    global _grid_cache_size
+    path=os.path.abspath(file)
+    key=(path,os.path.getmtime(path),pxsize,PA_disk,inc,d,size,dr,widir,type,center)
+    if key in _grid_cache:
+        _grid_cache.move_to_end(key)
+        return _grid_cache[key]
+
+    grid=PolarGrid(file,pxsize,PA_disk,inc,d,size,dr,widir,type,center)
+    if grid.nbytes>grid_cache_limit:
+        return grid
+    while _grid_cache and _grid_cache_size+grid.nbytes>grid_cache_limit:
+        _grid_cache_size-=_grid_cache.popitem(last=False)[1].nbytes
+    _grid_cache[key]=grid
+    _grid_cache_size+=grid.nbytes
+    return grid
+
+
+def clear_grid_cache():
+    global _grid_cache_size
+    _grid_cache.clear()
+    _grid_cache_size=0
@@ -10,6 +10,9 @@ from mcmax3d_analysis.mcmax3d_observables import convert_flux,convert_flux_data
 from mcmax3d_analysis.mcmax3d_image import display_image
 from mcmax3d_analysis.mcmax3d_convolution import convolve_model
 from astropy.convolution import Gaussian2DKernel
+from runconfig import load_config
+from fitscache import open_fits
+import geometry
 
 
 def pivot(data,r,PA,pxsize,d):
@@ -19,49 +22,22 @@ def pivot(data,r,PA,pxsize,d):
     xc=data.shape[1]*0.5
     yc=data.shape[0]*0.5
     
-    r=(r*units.au).to(units.pc).value # pc
-    r=((r/d)*units.rad).to(units.arcsec).value # arcsec
-    r=r/pxsize #px
-    PA=((PA+90)*units.deg).to(units.rad).value # w.r.t. x-axis 
-
-    xp=r*np.cos(PA)
-    yp=r*np.sin(PA)
-
-    x=xp+xc
-    y=yp+yc
+    x,y=geometry.to_xy(r,PA,xc,yc,pxsize,d)
 
     return (x,y,data[int(round(y)),int(round(x))])
     
 
 
 def prepare_Qphi_image(data,PA_disk):
-    infile=open("../input.dat").readlines()
-    for line in infile:
-        if line.split('=')[0]=='Distance':
-            d=float(line.split('=')[1])
-
-        
     ############################################################
-    # Loading Image.out info
-    imfile=open("../Image_jband.out").readlines()
-    for line in imfile:
-        if line.split('=')[0]=='MCobs:fov':
-            fov=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:npix':
-            npix=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:phi':
-            phi=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:theta':
-            theta=float(line.split('=')[1].split('!')[0])
-        else:
-            continue
+    # Loading Image.out and input.dat info
+    cfg=load_config("../Image_jband.out","../input.dat")
 
         
     ############################################################
     # Derived quantities
-    pxsize=fov/npix # pixel scale (arcsec/px)
-    phi=(phi*units.deg).to(units.rad).value # PA from north to east (rad)
-    e=np.sin(theta) # eccentricity of the annulus
+    pxsize=cfg.pxsize # pixel scale (arcsec/px)
+    phi=cfg.phi_rad # PA from north to east (rad)
 
     
     ############################################################
@@ -80,34 +56,16 @@ def prepare_Qphi_image(data,PA_disk):
     
 def prepare_alma_image(data,PA_disk,**kwargs):
 
-    infile=open("../input.dat").readlines()
-    for line in infile:
-        if line.split('=')[0]=='Distance':
-            d=float(line.split('=')[1])
-
-        
     ############################################################
-    # Loading Image.out info
-    imfile=open("../Image_alma.out").readlines()
-    for line in imfile:
-        if line.split('=')[0]=='MCobs:fov':
-            fov=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:npix':
-            npix=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:phi':
-            phi=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:theta':
-            theta=float(line.split('=')[1].split('!')[0])
-        else:
-            continue
+    # Loading Image.out and input.dat info
+    cfg=load_config("../Image_alma.out","../input.dat")
 
 
     ############################################################
     # Derived quantities
-    pxsize=fov/npix # pixel scale (arcsec/px)
-    phi=(phi*units.deg).to(units.rad).value # PA from north to east (rad)
-    e=np.sin(theta) # eccentricity of the annulus
-    cdelt=(fov*units.mas).to(units.deg).value
+    pxsize=cfg.pxsize # pixel scale (arcsec/px)
+    phi=cfg.phi_rad # PA from north to east (rad)
+    cdelt=(cfg.fov*units.mas).to(units.deg).value
 
 
     ############################################################
@@ -142,34 +100,18 @@ def prepare_alma_image(data,PA_disk,**kwargs):
 
 def peak_flux_alma_model(alma_model_rotated):
 
-    hdu=fits.open(alma_model_rotated)
+    hdu=open_fits(alma_model_rotated)
     data_rot_alma=hdu[0].data
 
-    infile=open("../input.dat").readlines()
-    for line in infile:
-        if line.split('=')[0]=='Distance':
-            d=float(line.split('=')[1])
-
-        
     ############################################################
-    # Loading Image.out info
-    imfile=open("../Image_alma.out").readlines()
-    for line in imfile:
-        if line.split('=')[0]=='MCobs:fov':
-            fov=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:npix':
-            npix=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:phi':
-            phi=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:theta':
-            theta=float(line.split('=')[1].split('!')[0])
-        else:
-            continue
+    # Loading Image.out and input.dat info
+    cfg=load_config("../Image_alma.out","../input.dat")
 
         
     ############################################################
     # Derived quantities
-    pxsize=fov/npix # pixel scale (arcsec/px)
+    pxsize=cfg.pxsize # pixel scale (arcsec/px)
+    d=cfg.distance # distance (pc)
 
 
     ############################################################
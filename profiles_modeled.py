@@ -12,6 +12,8 @@ from matplotlib.patches import Ellipse
 import matplotlib.gridspec as gridspec
 import cflux_alma 
 import cflux_jband
+from runconfig import load_config
+import results
 plt.style.use('fancy')
 
 def output_data():
@@ -78,13 +80,13 @@ def output_data():
 
     ############################################################
     # Loading profiles modeled
-    mprofile_alma=np.loadtxt("../alma_radial_profile_modeled.dat")
-    r_alma=np.reshape(mprofile_alma[:,0:1],mprofile_alma.shape[0])
-    b_alma=np.reshape(mprofile_alma[:,1:2],mprofile_alma.shape[0])
+    mprofile_alma=results.load_profile("alma_radial_profile_modeled")
+    r_alma=mprofile_alma["r"]
+    b_alma=mprofile_alma["b"]
     
-    mprofile_jband=np.loadtxt("../jband_radial_profile_modeled.dat")
-    r_jband=np.reshape(mprofile_jband[:,0:1],mprofile_jband.shape[0])
-    b_jband=np.reshape(mprofile_jband[:,1:2],mprofile_jband.shape[0])
+    mprofile_jband=results.load_profile("jband_radial_profile_modeled")
+    r_jband=mprofile_jband["r"]
+    b_jband=mprofile_jband["b"]
 
     ############################################################
     # Plotting
@@ -100,20 +102,8 @@ def output_data():
     path_fits_file='../output/RToutObs0001_000001.25.fits.gz'
     path_image_file='../Image_jband.out'
     path_input_file='../input.dat'
-    # Loading Image.out info
-    imfile=open(path_image_file).readlines()
-    for line in imfile:
-        if line.split('=')[0]=='MCobs:fov':
-            fov=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:npix':
-            npix=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:phi':
-            phi=float(line.split('=')[1].split('!')[0])
-        elif line.split('=')[0]=='MCobs:theta':
-            theta=float(line.split('=')[1].split('!')[0])
-        else:
-            continue
-    # Loading input.dat info
+    # Loading Image.out and input.dat info
+    cfg=load_config(path_image_file,path_input_file)
             
 
     # Determining extent
@@ -121,32 +111,16 @@ def output_data():
     xc=0#data_alma.shape[0]*0.5
     yc=0#data_alma.shape[0]*0.5
     
-    infile=open(path_input_file).readlines()
-    for line in infile:
-        if line.split('=')[0]=='Distance':
-            d=float(line.split('=')[1])
-        elif line.split('=')[0]=='zone1:Rin':
-            Rin01=float(line.split('=')[1])
-        elif line.split('=')[0]=='zone1:Rout':
-            Rout01=float(line.split('=')[1])
-        elif line.split('=')[0]=='zone2:Rin':
-            Rin02=float(line.split('=')[1])
-        elif line.split('=')[0]=='zone2:Rout':
-            Rout02=float(line.split('=')[1])
-        elif line.split('=')[0]=='zone3:Rin':
-            Rin03=float(line.split('=')[1])
-        elif line.split('=')[0]=='zone3:Rout':
-            Rout03=float(line.split('=')[1])
-        else:
-            continue
+    Rin01,Rout01=cfg.get('zone1:Rin'),cfg.get('zone1:Rout')
+    Rin02,Rout02=cfg.get('zone2:Rin'),cfg.get('zone2:Rout')
+    Rin03,Rout03=cfg.get('zone3:Rin'),cfg.get('zone3:Rout')
     """
     a1=Rout01
     a2=Rout02
     """
 
-    e=np.sin((theta*units.deg).to(units.rad).value)
-    d=(d*units.pc).value
-    pxsize=fov/npix
+    d=cfg.distance
+    pxsize=cfg.pxsize
  
     ax1.imshow(data_alma,clim=(vmin_alma,vmax_alma))
     ax2.imshow(data_jband,clim=(vmin_jband,vmax_jband))    
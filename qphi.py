@@ -0,0 +1,119 @@
+import numpy as np
+from collections import OrderedDict
+
+
+############################################################
+# LRU cache of basis tables, bounded by memory (bytes)
+basis_cache_limit=512*1024**2
+_basis_cache=OrderedDict()
+_basis_cache_size=0
+
+
+def angle_basis(shape,center=None,phi0=0.0):
+
+    ############################################################
+    #
+    # cos(2phi) and sin(2phi) of every pixel of an image.
+    #
+    # shape: (rows,columns) of the image
+    # center: (row,column) position of the star. Default is the
+    # geometric centre of the grid, as in combine_Polarizations
+    # phi0: offset added to the azimuth (deg)
+    #
+    # Returns the two basis tables, each with the image's shape.
+    #
+    ############################################################
+
+    ny,nx=shape[-2],shape[-1]
+    if center is None:
+        center=(ny*0.5-0.5,nx*0.5-0.5)
+    i=np.arange(ny,dtype=float)-center[0]
+    j=np.arange(nx,dtype=float)-center[1]
+    phi=np.arctan2(i[:,None],j[None,:])
+    phi+=np.deg2rad(phi0)
+    phi*=2.0
+    return np.cos(phi),np.sin(phi)
+
+
+def cached_angle_basis(shape,center=None,phi0=0.0):
+
+    ############################################################
+    #
+    # Same as angle_basis, but the tables are kept in an LRU
+    # cache keyed on (shape,center,phi0). The least recently
+    # used tables are dropped once the cache holds more than
+    # basis_cache_limit bytes. The returned arrays are
+    # read-only, since they are shared between calls.
+    #
+    ############################################################
+
+    global _basis_cache_size
+    ny,nx=shape[-2],shape[-1]
+    if center is None:
+        center=(ny*0.5-0.5,nx*0.5-0.5)
+    key=((ny,nx),(float(center[0]),float(center[1])),float(phi0))
+    if key in _basis_cache:
+        _basis_cache.move_to_end(key)
+        return _basis_cache[key]
+
+    c2phi,s2phi=angle_basis((ny,nx),center,phi0)
+    c2phi.flags.writeable=False
+    s2phi.flags.writeable=False
+    nbytes=c2phi.nbytes+s2phi.nbytes
+    if nbytes>basis_cache_limit:
+        return c2phi,s2phi
+    while _basis_cache and _basis_cache_size+nbytes>basis_cache_limit:
+        old=_basis_cache.popitem(last=False)[1]
+        _basis_cache_size-=old[0].nbytes+old[1].nbytes
+    _basis_cache[key]=(c2phi,s2phi)
+    _basis_cache_size+=nbytes
+    return c2phi,s2phi
+
+
+def clear_basis_cache():
+    global _basis_cache_size
+    _basis_cache.clear()
+    _basis_cache_size=0
+
+
+def combine_stokes(Q,U,phi0=0.0,center=None):
+
+    ############################################################
+    #
+    # Whole-array Qphi/Uphi transform.
+    #
+    # Q,U: Stokes frames with shape (...,rows,columns). Leading
+    # axes are broadcast, so stacks of frames go in one call.
+    # phi0: offset added to the azimuth (deg)
+    # center: (row,column) position of the star
+    #
+    # Returns Qphi, Uphi with the same shape as Q.
+    #
+    ############################################################
+
+    Q=np.asarray(Q,dtype=float)
+    U=np.asarray(U,dtype=float)
+    c2phi,s2phi=cached_angle_basis(Q.shape,center,phi0)
+    Qphi=Q*c2phi
+    Qphi+=U*s2phi
+    Uphi=U*c2phi
+    Uphi-=Q*s2phi
+    return Qphi,Uphi
+
+
+def combine_stack(stokes,phi0=0.0,center=None):
+
+    ############################################################
+    #
+    # stokes: array with shape (N,2,rows,columns) holding Q in
+    # [:,0] and U in [:,1].
+    #
+    # Returns an array with the same shape holding Qphi in [:,0]
+    # and Uphi in [:,1].
+    #
+    ############################################################
+
+    stokes=np.asarray(stokes,dtype=float)
+    out=np.empty(stokes.shape)
+    out[:,0],out[:,1]=combine_stokes(stokes[:,0],stokes[:,1],phi0,center)
+    return out
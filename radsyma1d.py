@@ -1,6 +1,5 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from astropy import units
 from astropy.io import fits
 from photutils import EllipticalAnnulus,CircularAnnulus,EllipticalAperture,RectangularAperture
 from photutils import aperture_photometry
@@ -8,47 +7,10 @@ from mcmax3d_analysis.mcmax3d_convolution import convolve_observation
 import matplotlib.gridspec as gridspec
 import sys
 from astropy.table import Table
+from polargrid import get_grid,grouped_std
 plt.style.use('fancy')
 
 
-def toAU(x,y,xc,yc,pxsize,d):
-
-    ############################################################
-    #
-    # d: distance to the source in pc
-    # pxsize: pixel scale in arcsec/px
-    #
-    # Return: Length in AU
-    #
-    ############################################################
-
-    dr=((x-xc)**2+(y-yc)**2)**0.5
-    dr=(dr*pxsize)
-    dr=(dr*units.arcsec).to(units.rad).value
-    dr=dr*((d*units.pc).to(units.au).value)
-    if x<=xc:
-        return +1.0*dr
-    else:
-        return -1.0*dr
-
-
-def topx(l,pxsize,d):
-
-    ############################################################
-    #
-    # d: distance to the source in pc
-    # pxsize: pixel scale in arcsec/px
-    #
-    # Return: Length in pixels
-    #
-    ############################################################
-
-    x=(l*units.au).to(units.pc).value
-    x=((x/d)*units.rad).to(units.arcsec).value
-    x=x/pxsize
-    return x
-
-
 def get_profile(file,pxsize,PA_disk,inc,d,size,padir,widir,dr,**kwargs):
     
     ############################################################
@@ -74,193 +36,41 @@ def get_profile(file,pxsize,PA_disk,inc,d,size,padir,widir,dr,**kwargs):
 
 
     ############################################################
-    # Load ALMA data
-    if kwargs['type']=='obs':
-        hdulist=fits.open(file)
-        data_obs=hdulist[0].data[0][0]
-        """
-        xc=hdulist[0].header['CRPIX1']
-        yc=hdulist[0].header['CRPIX2']
-        """
-        xc=data_obs.shape[1]*0.5
-        yc=data_obs.shape[0]*0.5
-        
-    elif kwargs['type']=='mod':
-        hdulist=fits.open(file)
-        data_obs=hdulist[0].data
-        xc=data_obs.shape[0]*0.5
-        yc=data_obs.shape[1]*0.5
-    
+    # Deprojected polar grid of the image (memoized per file
+    # and geometry, so every direction reuses it)
+    grid=get_grid(file,pxsize,PA_disk,inc,d,size,dr,widir,kwargs['type'])
+    a_mid=grid.a_mid
+    Nbins=grid.Nbins
+
+    print("Number of annular apertures: %d"%grid.Nring)
+
 
     ############################################################
     # Derived properties
-    angle_annulus=((PA_disk-90.0)*units.deg).to(units.rad).value 
     if padir<270.0:
         padir=padir+90.0
     else:
         padir=padir-270.0
-    e=np.sin((inc*units.deg).to(units.rad).value) 
-    d_au=(d*units.pc).to(units.au).value 
-    xc_array=[]
-    yc_array=[]
 
 
     ############################################################
-    # Creating elliptical aperture
-    linear_lim=2*(size) # AU
-    angular_lim=linear_lim/d_au # rad
-    angular_lim=(angular_lim*units.rad).to(units.arcsec).value # arcsec
-    pixel_lim=int(round(angular_lim/pxsize))
-    dr=topx(dr,pxsize,d) # width of each annular aperture
-    a_in_array=[]
-    for i in np.arange(yc+dr,yc+0.5*pixel_lim,dr):
-        a_in_array.append(i-xc)
-    a_out_array=[i+dr for i in a_in_array]
-    b_out_array=[i*(1-e**2)**0.5 for i in a_out_array]
-    a_in_array=np.array(a_in_array)
-    a_out_array=np.array(a_out_array)
-    apertures=[EllipticalAnnulus((yc,xc),a_in=ain,a_out=aout,b_out=bout,theta=angle_annulus)
-               for (ain,aout,bout) in zip(a_in_array,a_out_array,b_out_array)]
+    # Pixels inside the cone
+    ring,values=grid.cone(padir-0.5*widir,padir+0.5*widir)
 
-    print("Number of annular apertures: %d"%len(apertures))
-    """
-    # Do a check?
-    plt.imshow(data_obs)
-    apertures[-1].plot(color='red',lw=1)
-    plt.show()
-    """
 
     ############################################################
-    # Determine Nbins
-    Nbins=round(360.0/widir)
-
-
-    ############################################################
-    # Define class "Bin"
-    class Bin:
-        def __init__(self,ID,theta_min,theta_max,plist):
-            self.ID=ID
-            self.theta_min=theta_min
-            self.theta_max=theta_max
-            self.plist=plist
-
-        def showFlux(self):
-            i=0
-            for pixel in self.plist:
-                print(i,aperture_data[pixel[0],pixel[1]])
-                i+=1
-
-        def getArea(self,aperture):
-            value=aperture.area/Nbins
-            return value
-
-        def getFlux(self):
-            flux=0.0
-            for pixel in self.plist:
-                flux+=aperture_data[pixel[0],pixel[1]]
-            return flux
-
-        def getTheta(self):
-            value=(self.theta_max-self.theta_min)*0.5+self.theta_min
-            return value
-
-        def getError_beam(self,aperture):
-            beam_x=0.074 # arcsec
-            beam_y=0.057 # arcsec
-            flux_array=[]
-            for pixel in self.plist:
-                flux_array.append(aperture_data[pixel[0],pixel[1]])
-            area=aperture.area/Nbins
-            flux_array=np.array(flux_array)#/area
-            sigma=np.std(flux_array)
-            beam_area=np.pi*(beam_x)*(beam_y)/(4*np.log(2)) 
-            Nbeam=((aperture.area*pxsize**2)/Nbins)/beam_area
-            return sigma/(Nbeam)**0.5
-
-        def getError_pixel(self,aperture):
-            flux_array=[]
-            for pixel in self.plist:
-                flux_array.append(aperture_data[pixel[0],pixel[1]])
-            area=aperture.area/Nbins
-            flux_array=np.array(flux_array)/area
-            sigma=np.std(flux_array)
-            Npixel=len(self.plist)
-            return sigma/(Npixel)**0.5
-            
-    M=[]
-    E_beam=[]
-    E_pixel=[]
-    
-    a_in_array=[i*pxsize*d for i in a_in_array]
-    a_out_array=[i*pxsize*d for i in a_out_array]
-    a_mid=np.array([(j-i)*0.5+i for (j,i) in zip(a_out_array,a_in_array)])
-    
-    meanpxn=[]
-    for ii in range(0,len(apertures)):
-
-        ############################################################
-        # Creating bin
-        sbin=Bin(ii,padir-0.5*widir,padir+0.5*widir,[])        
-
-
-        ############################################################
-        # Creating aperture mask
-        mask=apertures[ii].to_mask(method="center")
-        """
-        # Do a check?
-        plt.imshow(mask)
-        plt.colorbar()
-        plt.show()
-        """
-
-        ############################################################
-        # Extracting pixels located inside the aperture
-        aperture_data=mask.multiply(data_obs)
-        """
-        # Do a check?
-        plt.imshow(aperture_data)
-        plt.colorbar()
-        plt.show()
-        """
-
-        ############################################################
-        # Creating array of pixel's index within the aperture 
-        # relative to the star
-        pixel_list=[]
-        ycc=int(aperture_data.shape[0]*0.5)
-        xcc=int(aperture_data.shape[1]*0.5)
-        for i in range(0,aperture_data.shape[1]): # Over columns 
-            for j in range(0,aperture_data.shape[0]): # Over rows
-                if aperture_data[j,i]!=0.0:
-                    pixel_list.append((j-ycc,i-xcc))
-
-
-        ############################################################
-        # Filling in sbin data
-        for point in pixel_list:
-            phi=np.arctan2(point[0],point[1])
-            if phi<0.0:
-                phi=2*np.pi+phi
-            phi=phi*180.0/np.pi
-            if sbin.theta_min<=phi<sbin.theta_max:
-                pixel=(int(point[0]+ycc),int(point[1]+xcc))
-                sbin.plist.append(pixel)
-
-
-        ############################################################
-        # Writing result
-        #value.showFlux()
-        M.append(sbin.getFlux()/sbin.getArea(apertures[ii]))
-        E_beam.append(sbin.getError_beam(apertures[ii]))
-        E_pixel.append(sbin.getError_pixel(apertures[ii]))
-        meanpxn.append(len(sbin.plist))
-        #print("I have %.1f pixels"%(len(sbin.plist)))
-
-    #print(np.mean(meanpxn))
-    
-    M=np.array(M)
-    E_beam=np.array(E_beam)
-    E_pixel=np.array(E_pixel)
+    # Flux and errors of every ring
+    beam_x=0.074 # arcsec
+    beam_y=0.057 # arcsec
+    beam_area=np.pi*(beam_x)*(beam_y)/(4*np.log(2)) 
+    bin_area=grid.area/Nbins # px^2
+    Nbeam=(bin_area*pxsize**2)/beam_area
+
+    M=np.bincount(ring,weights=values,minlength=grid.Nring)/bin_area
+    sigma,npix=grouped_std(ring,values,grid.Nring)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        E_beam=sigma/(Nbeam)**0.5
+        E_pixel=(sigma/bin_area)/(npix)**0.5
     
     print()
     print("Max value (Jy/beam/bin_area): %.1e"%(max(M)))
@@ -275,7 +85,7 @@ def get_profile(file,pxsize,PA_disk,inc,d,size,padir,widir,dr,**kwargs):
     ax=plt.axes()
     ax.errorbar(a_mid,M,yerr=E_beam,marker=".",fmt="-",color="red",capsize=2,elinewidth=0.5)
     #   ax.tick_params(labelleft=False,left=False)
-    #    ax.set_ylabel(r"%.1f"%((midtheta[i]*units.rad).to(units.deg).value))
+    #    ax.set_ylabel(r"%.1f"%(np.rad2deg(midtheta[i])))
     ax.set_xlabel(r"$r$(AU)")
     #ax.set_ylim(0,0.0175)
     plt.show()
@@ -290,25 +100,11 @@ get_profile("../PDS70/observations/PDS70_cont-final.fits",
 
 awidth=4
 
-x1=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-               0.020,158.6,49.7,113.43,120.0,338.6,20,awidth,type='obs')[0]
-y1=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-               0.020,158.6,49.7,113.43,120.0,338.6,20,awidth,type='obs')[1]
-y2=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,248.6,20,awidth,type='obs')[1]
-y3=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,158.6,20,awidth,type='obs')[1]
-y4=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,68.6,20,awidth,type='obs')[1]
-
-e1=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-               0.020,158.6,49.7,113.43,120.0,338.6,20,awidth,type='obs')[2]
-e2=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,248.6,20,awidth,type='obs')[2]
-e3=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,158.6,20,awidth,type='obs')[2]
-e4=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,68.6,20,awidth,type='obs')[2]
+obsfile="../PDS70/observations/PDS70_cont-final.fits"
+x1,y1,e1,_=get_profile(obsfile,0.020,158.6,49.7,113.43,120.0,338.6,20,awidth,type='obs')
+_,y2,e2,_=get_profile(obsfile,0.020,158.6,49.7,113.43,120.0,248.6,20,awidth,type='obs')
+_,y3,e3,_=get_profile(obsfile,0.020,158.6,49.7,113.43,120.0,158.6,20,awidth,type='obs')
+_,y4,e4,_=get_profile(obsfile,0.020,158.6,49.7,113.43,120.0,68.6,20,awidth,type='obs')
 
 fig=plt.figure(figsize=(5,12))
 gs=gridspec.GridSpec(4,1,hspace=0)
@@ -331,11 +127,7 @@ plt.show()
 
 sys.exit()
 
-y5=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,317,20,awidth,type='obs')[1]
-
-e5=get_profile("../PDS70/observations/PDS70_cont-final.fits",
-                  0.020,158.6,49.7,113.43,120.0,317,20,awidth,type='obs')[2]
+_,y5,e5,_=get_profile(obsfile,0.020,158.6,49.7,113.43,120.0,317,20,awidth,type='obs')
 
 plt.errorbar(x1,y4/max(y4),yerr=e4/max(y4),marker=".",fmt="--",color="orange",label="$237^\circ$")
 plt.errorbar(x1,y1/max(y1),yerr=e1/max(y1),marker=".",fmt="--",color="red",label="$257^\circ$")
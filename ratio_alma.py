@@ -1,11 +1,12 @@
 import numpy as np
 import sys
+import results
 
 
 def ratio_SMsm():
-    data=np.loadtxt("../azprofile_alma_mod.dat")
-    r=np.reshape(data[:,0:1],data.shape[0])
-    b=np.reshape(data[:,1:2],data.shape[0])
+    data=results.load_profile("azprofile_alma_mod")
+    r=data["angle"]
+    b=data["b"]
     
     w=50.0
     min1=79.9
@@ -33,9 +34,7 @@ def ratio_SMsm():
     bmax1_val=max(bmax1)
     bmax2_val=max(bmax2)
 
-    f=open("../ratios.dat","w")
-    f.write("ratio_1=%.5f\n"%(bmax1_val/bmin1_val))
-    f.write("ratio_2=%.5f\n"%(bmax2_val/bmin2_val))
+    results.write_text("../ratios.dat","ratio_1=%.5f\nratio_2=%.5f\n"%(bmax1_val/bmin1_val,bmax2_val/bmin2_val))
     print("ratio_1=%.5f"%(bmax1_val/bmin1_val))
     print("ratio_2=%.5f"%(bmax2_val/bmin2_val))
     
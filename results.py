@@ -0,0 +1,220 @@
+import os
+import tempfile
+import numpy as np
+
+
+############################################################
+#
+# Columnar store of the extracted profiles. Each run keeps
+# its profiles in ../results (the run's group), one .npz per
+# profile holding named columns and their units. A sweep
+# collects the groups of many runs into a single .npz whose
+# keys are "run/profile/column".
+#
+############################################################
+
+store_dir='../results'
+
+# Process umask, read once at import (os.umask can only be read
+# by setting it)
+_umask=os.umask(0)
+os.umask(_umask)
+
+
+class Profile(dict):
+
+    ############################################################
+    #
+    # Named columns of a profile (dict of arrays) with their
+    # units in self.units. self.columns keeps the column order.
+    #
+    ############################################################
+
+    def __init__(self,columns,units):
+        columns=list(columns)
+        dict.__init__(self,columns)
+        self.columns=[column for column,values in columns]
+        self.units=dict(units)
+
+
+    def table(self):
+
+        ############################################################
+        # Columns stacked as a (rows,columns) array, in the order
+        # they were saved
+        return np.column_stack([self[name] for name in self.columns])
+
+
+def path(name,folder=store_dir):
+    return os.path.join(folder,name+'.npz')
+
+
+def _replace(tmp,target):
+
+    ############################################################
+    # Rename tmp onto target. mkstemp creates tmp with mode
+    # 0600, so it first gets the mode of the file it replaces,
+    # or the umask default of a new file
+    if os.path.exists(target):
+        mode=os.stat(target).st_mode&0o7777
+    else:
+        mode=0o666&~_umask
+    os.chmod(tmp,mode)
+    os.replace(tmp,target)
+    return None
+
+
+def _savez_atomic(target,arrays):
+
+    ############################################################
+    # np.savez to a temporary file renamed onto target, so
+    # concurrent readers never see a half-written store
+    folder=os.path.dirname(os.path.abspath(target))
+    os.makedirs(folder,exist_ok=True)
+    fd,tmp=tempfile.mkstemp(dir=folder,suffix='.tmp')
+    try:
+        with os.fdopen(fd,'wb') as fout:
+            np.savez(fout,**arrays)
+        _replace(tmp,target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return None
+
+
+def write_text(file,text):
+
+    ############################################################
+    #
+    # Write a text file atomically: the text goes to a
+    # temporary file in the same folder, which is flushed,
+    # closed and renamed onto file.
+    #
+    ############################################################
+
+    folder=os.path.dirname(os.path.abspath(file))
+    os.makedirs(folder,exist_ok=True)
+    fd,tmp=tempfile.mkstemp(dir=folder,suffix='.tmp')
+    try:
+        with os.fdopen(fd,'w') as fout:
+            fout.write(text)
+        _replace(tmp,file)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return None
+
+
+def write_table(file,columns,fmt='%.15e',line=None):
+
+    ############################################################
+    #
+    # Text table for outputs that have to stay text. All rows
+    # are formatted with a single %-operation and written
+    # atomically with write_text.
+    #
+    # columns: list of 1D arrays of the same length
+    # fmt: format of every column, separated by one space
+    # line: format of a whole line, e.g. "%.5e %.5e \n".
+    # Overrides fmt
+    #
+    ############################################################
+
+    table=np.column_stack(columns)
+    if line is None:
+        line=' '.join([fmt]*table.shape[1])+'\n'
+    write_text(file,(line*table.shape[0])%tuple(table.ravel().tolist()))
+    return None
+
+
+def save_profile(name,columns,units,folder=store_dir):
+
+    ############################################################
+    #
+    # name: profile name, e.g. 'alma_radial_profile_modeled'
+    # columns: list of (column name, array)
+    # units: list with the unit of each column
+    # folder: group (run) where the profile is stored
+    #
+    ############################################################
+
+    arrays={column:np.asarray(values) for column,values in columns}
+    arrays['_columns']=np.array([column for column,values in columns])
+    arrays['_units']=np.array(units)
+    _savez_atomic(path(name,folder),arrays)
+    return None
+
+
+def load_profile(name,folder=store_dir):
+
+    ############################################################
+    #
+    # Profile saved by save_profile. name may also be the path
+    # of the .npz itself.
+    #
+    ############################################################
+
+    file=name if name.endswith('.npz') else path(name,folder)
+    with np.load(file) as f:
+        columns=[str(column) for column in f['_columns']]
+        units=[str(unit) for unit in f['_units']]
+        return Profile([(column,f[column]) for column in columns],zip(columns,units))
+
+
+def collect(runs,names,target,folder='results'):
+
+    ############################################################
+    #
+    # Gather the profiles of many runs into one .npz.
+    #
+    # runs: dict {run name: run directory}
+    # names: profiles to collect
+    # target: output .npz
+    # folder: store folder inside each run directory
+    #
+    # Profiles missing in a run are skipped.
+    #
+    ############################################################
+
+    arrays={}
+    for run,run_dir in runs.items():
+        for name in names:
+            file=path(name,os.path.join(run_dir,folder))
+            if not os.path.exists(file):
+                continue
+            profile=load_profile(file)
+            for column in profile.columns:
+                arrays['%s/%s/%s'%(run,name,column)]=profile[column]
+            arrays['%s/%s/_columns'%(run,name)]=np.array(profile.columns)
+            arrays['%s/%s/_units'%(run,name)]=np.array([profile.units[c] for c in profile.columns])
+    _savez_atomic(target,arrays)
+    return None
+
+
+def load_sweep(file,names=None,runs=None):
+
+    ############################################################
+    #
+    # Read a store written by collect. Run names may contain
+    # '/' (runs in nested folders), profile names may not.
+    #
+    # names,runs: only read these profiles / runs (default: all).
+    # The .npz members of the other ones are never read.
+    #
+    # Returns {run: {profile: Profile}}.
+    #
+    ############################################################
+
+    sweep={}
+    with np.load(file) as f:
+        for key in f.files:
+            if not key.endswith('/_columns'):
+                continue
+            run,name,_=key.rsplit('/',2)
+            if (names is not None and name not in names) or (runs is not None and run not in runs):
+                continue
+            columns=[str(column) for column in f[key]]
+            units=[str(unit) for unit in f['%s/%s/_units'%(run,name)]]
+            profile=Profile([(c,f['%s/%s/%s'%(run,name,c)]) for c in columns],zip(columns,units))
+            sweep.setdefault(run,{})[name]=profile
+    return sweep
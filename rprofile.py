@@ -0,0 +1,118 @@
+import numpy as np
+
+
+def elliptical_radius(shape,inc,PA,center=None):
+
+    ############################################################
+    #
+    # Deprojected (elliptical) radius of every pixel.
+    #
+    # shape: (rows,columns) of the image
+    # inc: disk's inclination (deg)
+    # PA: position angle of the major axis measured east-north
+    # (deg). PA=90 puts the major axis along the x-axis.
+    # center: (x,y) position of the star in pixels. Default is
+    # (0.5*columns,0.5*rows), as used for the annular apertures
+    #
+    # Returns the semi-major axis (px) of the ellipse passing
+    # through each pixel.
+    #
+    ############################################################
+
+    ny,nx=shape
+    if center is None:
+        center=(0.5*nx,0.5*ny)
+    angle=np.deg2rad(PA-90.0)
+    x=np.arange(nx,dtype=float)-center[0]
+    y=np.arange(ny,dtype=float)-center[1]
+    xp=x[None,:]*np.cos(angle)+y[:,None]*np.sin(angle) # along major axis
+    yp=-x[None,:]*np.sin(angle)+y[:,None]*np.cos(angle) # along minor axis
+    yp/=np.cos(np.deg2rad(inc))
+    return np.hypot(xp,yp)
+
+
+def radial_profile(data,pxsize,d,inc,PA,dr,rmin,rmax,x0=0.0,y0=0.0,center=None):
+
+    ############################################################
+    #
+    # Azimuthally averaged brightness in elliptical rings, all
+    # rings reduced in a single pass with np.bincount.
+    #
+    # data: 2D image
+    # pxsize: pixel scale (arcsec/px)
+    # d: distance to the source (pc)
+    # inc: disk's inclination (deg)
+    # PA: position angle of the disk measured east-north (deg)
+    # dr: width of the rings (AU)
+    # rmin,rmax: inner edge of the first ring and limit of the
+    # last ring (AU)
+    # x0,y0: offset of the star along the x and y axes (arcsec)
+    # center: (x,y) reference position in pixels, see
+    # elliptical_radius
+    #
+    # Returns the mid radius of each ring (AU), the mean
+    # brightness in each ring and the number of pixels used.
+    #
+    ############################################################
+
+    data=np.asarray(data)
+    ny,nx=data.shape
+    if center is None:
+        center=(0.5*nx,0.5*ny)
+    center=(center[0]+x0/pxsize,center[1]+y0/pxsize)
+
+    r=elliptical_radius(data.shape,inc,PA,center)*(pxsize*d) # AU
+    nring=len(np.arange(rmin,rmax,dr))
+    index=np.floor((r-rmin)/dr).astype(int)
+    good=(index>=0)&(index<nring)&np.isfinite(data)
+
+    flux=np.bincount(index[good],weights=data[good],minlength=nring)
+    npix=np.bincount(index[good],minlength=nring)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        brightness=flux/npix
+    r_mid=rmin+(np.arange(nring)+0.5)*dr
+
+    return r_mid,brightness,npix
+
+
+def azimuthal_profile(data,inc,PA,amin,amax,Nbins,center=None):
+
+    ############################################################
+    #
+    # Mean brightness in azimuthal bins of an elliptical
+    # annulus. The polar angle of each pixel is computed once
+    # and all bins are reduced in one pass with np.bincount.
+    #
+    # data: 2D image
+    # inc: disk's inclination (deg)
+    # PA: position angle of the disk measured east-north (deg)
+    # amin,amax: inner and outer semi-major axis of the
+    # annulus (px)
+    # Nbins: number of azimuthal bins over 2pi
+    # center: (x,y) position of the star in pixels
+    #
+    # Returns the mid angle of each bin (rad, counterclockwise
+    # from the x-axis), the mean brightness in each bin and the
+    # number of pixels used. Pixels equal to zero are skipped.
+    #
+    ############################################################
+
+    data=np.asarray(data)
+    ny,nx=data.shape
+    if center is None:
+        center=(0.5*nx,0.5*ny)
+    r=elliptical_radius(data.shape,inc,PA,center)
+    x=np.arange(nx,dtype=float)-center[0]
+    y=np.arange(ny,dtype=float)-center[1]
+    phi=np.arctan2(y[:,None],x[None,:])%(2*np.pi)
+
+    index=np.minimum((phi*(Nbins/(2*np.pi))).astype(int),Nbins-1)
+    good=(r>=amin)&(r<amax)&(data!=0.0)&np.isfinite(data)
+
+    flux=np.bincount(index[good],weights=data[good],minlength=Nbins)
+    npix=np.bincount(index[good],minlength=Nbins)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        brightness=flux/npix
+    theta_mid=(np.arange(Nbins)+0.5)*(2*np.pi/Nbins)
+
+    return theta_mid,brightness,npix
@@ -0,0 +1,136 @@
+import os
+import numpy as np
+from astropy import units
+
+
+############################################################
+# Parsed parameter files and run configurations, keyed on
+# the absolute path and modification time of the files
+_parfile_cache={}
+_config_cache={}
+
+pc_to_au=(1.0*units.pc).to(units.au).value
+
+
+def _convert(value):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return float(value.replace('d','e').replace('D','E'))
+    except ValueError:
+        return value
+
+
+def _stamp(path):
+    path=os.path.abspath(path)
+    return (path,os.path.getmtime(path))
+
+
+def read_parfile(path):
+
+    ############################################################
+    #
+    # Parse a MCMax3D parameter file (input.dat, Image.out) into
+    # a dictionary. Lines look like 'key=value ! comment'. Values
+    # are converted to int or float when possible. The result
+    # is cached and only re-read if the file changed on disk.
+    #
+    ############################################################
+
+    stamp=_stamp(path)
+    if stamp in _parfile_cache:
+        return _parfile_cache[stamp]
+
+    pars={}
+    for line in open(path).readlines():
+        if '=' not in line:
+            continue
+        key,value=line.split('=',1)
+        key=key.strip()
+        if key=='' or key[0] in '!#*':
+            continue
+        pars[key]=_convert(value.split('!')[0].strip())
+
+    for old in [k for k in _parfile_cache if k[0]==stamp[0]]:
+        del _parfile_cache[old]
+    _parfile_cache[stamp]=pars
+    return pars
+
+
+class RunConfig(dict):
+
+    ############################################################
+    #
+    # Parameters of a MCMax3D run: the entries of input.dat and
+    # (optionally) of an Image.out file, plus the derived
+    # quantities used across the analysis scripts.
+    #
+    # image_file: path to Image_alma.out, Image_jband.out,...
+    # input_file: path to input.dat
+    # Either file can be None if it is not needed.
+    #
+    ############################################################
+
+    def __init__(self,image_file=None,input_file='../input.dat'):
+        dict.__init__(self)
+        if input_file is not None:
+            self.update(read_parfile(input_file))
+        if image_file is not None:
+            self.update(read_parfile(image_file))
+
+    @property
+    def fov(self):
+        return float(self['MCobs:fov']) # arcsec
+
+    @property
+    def npix(self):
+        return float(self['MCobs:npix'])
+
+    @property
+    def phi(self):
+        return float(self['MCobs:phi']) # deg
+
+    @property
+    def theta(self):
+        return float(self['MCobs:theta']) # deg
+
+    @property
+    def distance(self):
+        return float(self['Distance']) # pc
+
+    @property
+    def pxsize(self):
+        return self.fov/self.npix # arcsec/px
+
+    @property
+    def phi_rad(self):
+        return np.deg2rad(self.phi) # rad
+
+    @property
+    def inc(self):
+        return np.deg2rad(self.theta) # rad
+
+    @property
+    def d_au(self):
+        return self.distance*pc_to_au # au
+
+
+def load_config(image_file=None,input_file='../input.dat'):
+
+    ############################################################
+    #
+    # Memoized RunConfig. The same object is returned as long as
+    # none of the files changed on disk.
+    #
+    ############################################################
+
+    key=tuple(None if f is None else _stamp(f) for f in (input_file,image_file))
+    if key not in _config_cache:
+        _config_cache[key]=RunConfig(image_file,input_file)
+    return _config_cache[key]
@@ -2,6 +2,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import savgol_filter
 import sys
+import results
 
 data=np.loadtxt("radial_cut_0FWHM.dat")
 x=np.reshape(data[:,0:1],data.shape[0])
@@ -28,9 +29,6 @@ plt.ylim(-0.5,3.0)
 plt.legend(loc="upper right")
 plt.show()
 
-f=open("jband_radial_cut_0FWHM_smoothed.dat","w")
-for i in range(0,len(xx)):
-    f.write("%.5e %.5e\n"%(xx[i],yyf[i]/vpeak))
-f.close()
+results.write_table("jband_radial_cut_0FWHM_smoothed.dat",[xx,yyf/vpeak],fmt="%.5e")
     
     